@@ -2,9 +2,304 @@
 # -*- coding: utf-8 -*-
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
 
+import argparse
+import collections
+import hashlib
+import json
+import mmap
 import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 import lief
 
+try:
+    from disk_cache import DiskCache, get_cache
+except ImportError:  # Installed without disk_cache.py, the findings are not cached
+    DiskCache = None
+
+    def get_cache(folder_variable, size_variable):
+        return None
+
+this = sys.modules[__name__]
+
+# Leading bytes of the binary formats, see https://en.wikipedia.org/wiki/List_of_file_signatures
+BINARY_MAGICS = ((b"\x7fELF", "ELF"),
+                 (b"MZ", "PE"),
+                 (b"\xfe\xed\xfa\xce", "Mach-O"), (b"\xce\xfa\xed\xfe", "Mach-O"),
+                 (b"\xfe\xed\xfa\xcf", "Mach-O"), (b"\xcf\xfa\xed\xfe", "Mach-O"),
+                 (b"!<arch>\n", "archive"))
+FAT_MACHO_MAGICS = (b"\xca\xfe\xba\xbe", b"\xca\xfe\xba\xbf")
+
+
+def ar_members(f):
+    """ Name and size of the members of the ar archive opened in 'f' (GNU, BSD and MSVC
+        variants). When a member is yielded 'f' is at the beginning of its data, the data of the
+        members is never read here but skipped
+    """
+    if f.read(8) != b"!<arch>\n":
+        return
+    long_names = b""
+    offset = 8
+    while True:
+        f.seek(offset)
+        header = f.read(60)
+        if len(header) < 60 or header[58:60] != b"`\n":
+            return
+        name = header[:16].decode("ascii", "replace").rstrip(" ")
+        try:
+            size = int(header[48:58])
+        except ValueError:
+            return
+        data_offset = offset + 60
+        offset = data_offset + size + size % 2
+        if name.startswith("#1/"):  # BSD: the name is at the beginning of the data
+            length = int(name[3:])
+            name = f.read(length).rstrip(b"\0").decode("utf-8", "replace")
+            data_offset, size = data_offset + length, size - length
+            if name.startswith("__.SYMDEF"):
+                continue
+        elif name == "//":  # GNU and MSVC: table of long names
+            long_names = f.read(size)
+            continue
+        elif name in ("/", "/SYM64/") or name.startswith("__.SYMDEF"):  # Symbol tables
+            continue
+        elif name[:1] == "/" and name[1:].isdigit():
+            start = int(name[1:])
+            ends = [long_names.find(end, start) for end in (b"/\n", b"\0", b"\n")]
+            end = min([end for end in ends if end >= 0] or [len(long_names)])
+            name = long_names[start:end].decode("utf-8", "replace")
+        elif name.endswith("/"):
+            name = name[:-1]
+        f.seek(data_offset)
+        yield name, size
+
+
+def object_machine(header):
+    """ Format ('ELF', 'PE' or 'Mach-O') and machine of an object file from its first bytes,
+        None if it is not a known object file
+    """
+    if header[:4] == b"\x7fELF" and len(header) >= 20:
+        return "ELF", struct.unpack_from("<H" if header[5:6] == b"\x01" else ">H", header, 18)[0]
+    if header[:4] in (b"\xfe\xed\xfa\xce", b"\xfe\xed\xfa\xcf") and len(header) >= 8:
+        return "Mach-O", struct.unpack_from(">i", header, 4)[0]
+    if header[:4] in (b"\xce\xfa\xed\xfe", b"\xcf\xfa\xed\xfe") and len(header) >= 8:
+        return "Mach-O", struct.unpack_from("<i", header, 4)[0]
+    if header[:4] == b"\0\0\xff\xff" and len(header) >= 8:  # Import or /bigobj object
+        return "PE", struct.unpack_from("<H", header, 6)[0]
+    if len(header) >= 2 and struct.unpack_from("<H", header)[0] in COFF_MACHINES:
+        return "PE", struct.unpack_from("<H", header)[0]
+    return None
+
+
+# Machine field of the object files for each format and architecture
+_ARM = ('armv6', 'armv7', 'armv7s', 'armv7k', 'armv7hf')
+OBJECT_MACHINES = {
+    "ELF": dict([(arch, (40,)) for arch in _ARM],
+                x86=(3,), x86_64=(62,), armv8=(183,), avr=(83,), ppc=(20,), ppcle=(20,),
+                ppc64=(21,), ppc64le=(21,), sparc=(2,), sparcv9=(43,), mips=(8,), mips64=(8,)),
+    "PE": dict([(arch, (0x1c0, 0x1c2, 0x1c4)) for arch in _ARM],
+               x86=(0x14c,), x86_64=(0x8664,), armv8=(0xaa64,)),
+    "Mach-O": dict([(arch, (12,)) for arch in _ARM],
+                   x86=(7,), x86_64=(0x1000007,), armv8=(0x100000c,), ppc=(18,), ppcle=(18,),
+                   ppc64=(0x1000012,), ppc64le=(0x1000012,)),
+}
+COFF_MACHINES = frozenset(machine for machines in OBJECT_MACHINES["PE"].values() for machine in machines)
+ARCHIVE_FORMATS = {lief.EXE_FORMATS.ELF: "ELF", lief.EXE_FORMATS.PE: "PE",
+                   lief.EXE_FORMATS.MACHO: "Mach-O"}
+
+
+def file_digest(filename, chunk_size=1024 * 1024):
+    """ sha256 of the content of the file, mapped in memory and hashed in chunks """
+    sha = hashlib.sha256()
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:  # Empty files cannot be mapped
+            return sha.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for start in range(0, len(data), chunk_size):
+                sha.update(data[start:start + chunk_size])
+    return sha.hexdigest()
+
+
+def _hook_digest():
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read() + lief.__version__.encode()).hexdigest()
+
+
+# 'slices' are the headers of each architecture of universal Mach-O binaries, otherwise None.
+# 'file_type' is only set for Mach-O binaries, to check the type of each slice
+BinaryHeaders = collections.namedtuple("BinaryHeaders", ("format", "machine", "shared", "imports",
+                                                         "slices", "file_type"))
+
+
+def _c_string(data, start):
+    end = data.find(b"\0", start)
+    return data[start:end if end >= 0 else len(data)].decode("utf-8", "replace")
+
+
+def _read_elf_headers(data):
+    endian = "<" if data[5:6] == b"\x01" else ">"
+    file_type, machine = struct.unpack_from(endian + "HH", data, 16)
+    return BinaryHeaders(lief.EXE_FORMATS.ELF, lief.ELF.ARCH(machine), file_type == 3, None,
+                         None, None)  # ET_DYN
+
+
+def _read_pe_headers(data):
+    pe_offset = struct.unpack_from("<I", data, 0x3c)[0]
+    if data[pe_offset:pe_offset + 4] != b"PE\0\0":
+        return None
+    machine, number_of_sections, _, _, _, optional_header_size, characteristics = \
+        struct.unpack_from("<HHIIIHH", data, pe_offset + 4)
+    optional_header = pe_offset + 24
+    magic = struct.unpack_from("<H", data, optional_header)[0]
+    if magic not in (0x10b, 0x20b):  # PE32, PE32+
+        return None
+    data_directories = optional_header + (96 if magic == 0x10b else 112)
+    number_of_directories = struct.unpack_from("<I", data, data_directories - 4)[0]
+
+    sections = []
+    section_table = optional_header + optional_header_size
+    for i in range(number_of_sections):
+        # VirtualSize, VirtualAddress, SizeOfRawData, PointerToRawData
+        sections.append(struct.unpack_from("<IIII", data, section_table + i * 40 + 8))
+
+    def _offset(rva):
+        for virtual_size, virtual_address, raw_size, raw_pointer in sections:
+            if virtual_address <= rva < virtual_address + max(virtual_size, raw_size):
+                return rva - virtual_address + raw_pointer
+        raise ValueError("RVA %#x is not in any section" % rva)
+
+    imports = []
+    import_rva = struct.unpack_from("<I", data, data_directories + 8)[0] \
+        if number_of_directories > 1 else 0
+    if import_rva:
+        descriptor = _offset(import_rva)
+        while True:
+            lookup, _, _, name_rva, thunk = struct.unpack_from("<IIIII", data, descriptor)
+            if not (lookup or name_rva or thunk):
+                break
+            imports.append(_c_string(data, _offset(name_rva)))
+            descriptor += 20
+    return BinaryHeaders(lief.EXE_FORMATS.PE, lief.PE.MACHINE_TYPES(machine),
+                         bool(characteristics & 0x2000), imports, None, None)  # IMAGE_FILE_DLL
+
+
+def _read_macho_headers(data, offset=0):
+    magic = data[offset:offset + 4]
+    if magic in FAT_MACHO_MAGICS:
+        if offset:  # Nested universal binaries are not valid
+            raise ValueError("Universal binary inside a universal binary")
+        # fat_arch or fat_arch_64 entries, the slices are read where they are, without copies
+        entry_format, entry_size = (">iiI", 20) if magic == b"\xca\xfe\xba\xbe" else (">iiQ", 32)
+        slices = []
+        for i in range(struct.unpack_from(">I", data, 4)[0]):
+            _, _, slice_offset = struct.unpack_from(entry_format, data, 8 + i * entry_size)
+            slices.append(_read_macho_headers(data, slice_offset))
+        return BinaryHeaders(lief.EXE_FORMATS.MACHO, None, any(it.shared for it in slices), None,
+                             tuple(slices), None)
+    if magic not in _MACHO_MAGICS:
+        raise ValueError("Invalid Mach-O binary")
+    endian = ">" if magic in (b"\xfe\xed\xfa\xce", b"\xfe\xed\xfa\xcf") else "<"
+    cpu_type, _, file_type = struct.unpack_from(endian + "iiI", data, offset + 4)
+    return BinaryHeaders(lief.EXE_FORMATS.MACHO, lief.MachO.CPU_TYPES(cpu_type),
+                         file_type == 6, None, None, lief.MachO.FILE_TYPES(file_type))  # MH_DYLIB
+
+
+def read_headers(filename):
+    """ Format, machine, whether it is a shared library, imported libraries (only for PE) and
+        slices (only for universal Mach-O) of the binary, reading only its headers. None if they
+        cannot be read that way (malformed files), then lief has to parse the whole binary
+    """
+    try:
+        with open(filename, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:4] == b"\x7fELF":
+                    return _read_elf_headers(data)
+                if data[:2] == b"MZ":
+                    return _read_pe_headers(data)
+                if data[:4] in _MACHO_MAGICS or data[:4] in FAT_MACHO_MAGICS:
+                    return _read_macho_headers(data)
+                return None
+    except (EnvironmentError, ValueError, struct.error):
+        return None
+
+
+def parse_headers(filename):
+    """ The same as read_headers, parsing the binary with lief """
+    binary = lief.parse(filename)
+    if not binary:
+        return None
+    if binary.format == lief.EXE_FORMATS.ELF:
+        return BinaryHeaders(binary.format, binary.header.machine_type,
+                             binary.header.file_type == lief.ELF.E_TYPE.DYNAMIC, None, None, None)
+    if binary.format == lief.EXE_FORMATS.PE:
+        return BinaryHeaders(binary.format, binary.header.machine,
+                             binary.header.has_characteristic(lief.PE.HEADER_CHARACTERISTICS.DLL),
+                             [i.name for i in binary.imports], None, None)
+    if binary.format == lief.EXE_FORMATS.MACHO:
+        binary = binary.at(0) if isinstance(binary, lief.MachO.FatBinary) else binary
+        return BinaryHeaders(lief.EXE_FORMATS.MACHO, binary.header.cpu_type,
+                             binary.header.file_type == lief.MachO.FILE_TYPES.DYLIB, None, None,
+                             binary.header.file_type)
+    return None
+
+
+_MACHO_MAGICS = (b"\xfe\xed\xfa\xce", b"\xce\xfa\xed\xfe", b"\xfe\xed\xfa\xcf", b"\xcf\xfa\xed\xfe")
+
+
+def _runtime_name(version):
+    return 'msvcr%s0' % version if version < 14 else 'vcruntime140'
+
+
+_VISUAL_STUDIO_VERSIONS = range(8, 18)
+# Visual Studio version -> runtime -> library
+RUNTIME_LIBRARIES = {str(version): {'MDd': _runtime_name(version) + 'd.dll',
+                                    'MD': _runtime_name(version) + '.dll'}
+                     for version in _VISUAL_STUDIO_VERSIONS}
+RUNTIME_LIBRARY_NAMES = tuple(collections.OrderedDict.fromkeys(
+    RUNTIME_LIBRARIES[str(version)][runtime] for version in _VISUAL_STUDIO_VERSIONS
+    for runtime in ('MDd', 'MD')))
+
+Finding = collections.namedtuple("Finding", ("filename", "check", "severity", "message"))
+
+
+def binary_format(filename):
+    """ Format of the file ('ELF', 'PE', 'Mach-O' or 'archive') reading only its first bytes,
+        None if it is not a binary
+    """
+    try:
+        with open(filename, "rb") as f:
+            header = f.read(8)
+    except (IOError, OSError):
+        return None
+    for magic, format_ in BINARY_MAGICS:
+        if header.startswith(magic):
+            return format_
+    # Java class files share the magic of universal binaries, but there the next field is the
+    # class version (>= 45) instead of the number of architectures
+    if header[:4] in FAT_MACHO_MAGICS and len(header) == 8 \
+            and 0 < struct.unpack(">I", header[4:])[0] < 45:
+        return "Mach-O"
+    return None
+
+
+_HEADER_EXTENSIONS = frozenset((".h", ".hh", ".hpp", ".hxx", ".h++", ".inl", ".ipp", ".tcc"))
+_TEXT_EXTENSIONS = frozenset((".txt", ".md", ".rst", ".cmake", ".pc", ".la", ".json", ".xml",
+                              ".yml", ".yaml", ".ini", ".cfg", ".py", ".sh", ".bat", ".html", ".in"))
+_TEXT_NAMES = ("license", "licence", "copying", "copyright", "notice", "readme", "authors")
+
+
+def skipped_category(filename):
+    """ Kind of a file that is not a binary, by its name: 'headers', 'text' or 'other' """
+    name = os.path.basename(filename).lower()
+    extension = os.path.splitext(name)[1]
+    if extension in _HEADER_EXTENSIONS:
+        return "headers"
+    if extension in _TEXT_EXTENSIONS or name.startswith(_TEXT_NAMES):
+        return "text"
+    return "other"
+
 
 class BinaryLinter(object):
     def __init__(self, output, conanfile, conanfile_path):
@@ -38,30 +333,111 @@ class BinaryLinter(object):
             'watchOS': lief.EXE_FORMATS.MACHO,
             'tvOS': lief.EXE_FORMATS.MACHO
         }.get(self._os, None)
+        self._jobs = int(os.getenv("CONAN_BINARY_LINTER_JOBS", "1"))
+        self._findings = []
+        self._cache = get_cache("CONAN_BINARY_LINTER_CACHE_DIR", "CONAN_BINARY_LINTER_CACHE_SIZE")
+        if self._cache:
+            # Everything but the binary the findings depend on
+            self._cache_settings = [_hook_digest(), str(self._expected_format)] + [
+                str(value) if value is not None else None for value in (
+                    self._os, self._subsystem, self._arch, self._compiler, self._compiler_version,
+                    self._compiler_runtime, self._shared)]
+
+    def __getstate__(self):
+        # Only the settings travel to the worker processes, the findings come back. The cache
+        # is opened again by each worker, its module is registered by Conan with another name
+        state = self.__dict__.copy()
+        for attribute in ("_output", "_conanfile", "_findings", "_binary", "_imports", "_cache"):
+            state.pop(attribute, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._findings = []
+        self._cache = get_cache("CONAN_BINARY_LINTER_CACHE_DIR", "CONAN_BINARY_LINTER_CACHE_SIZE")
 
     def verify(self):
         if not self._expected_format:
             self._output.warn("don't know how to verify for os %s, giving up..." % self._os)
             return
+        skipped = collections.Counter()
+        binaries = []
         for root, _, filenames in os.walk(self._conanfile.package_folder):
             for filename in filenames:
                 filename = os.path.join(root, filename)
-                self._verify_file(filename)
+                if binary_format(filename) is None:
+                    skipped[skipped_category(filename)] += 1
+                    continue
+                binaries.append(filename)
+        binaries.sort()
+
+        if self._jobs > 1 and len(binaries) > 1:
+            # The workers import this module by name, but Conan registers it with another one
+            previous = sys.modules.get(__name__)
+            sys.modules[__name__] = this
+            hooks_folder = os.path.dirname(os.path.abspath(__file__))
+            if hooks_folder not in sys.path:
+                sys.path.append(hooks_folder)
+            try:
+                with ProcessPoolExecutor(min(self._jobs, len(binaries))) as executor:
+                    results = list(executor.map(self._verify_file, binaries))
+            finally:
+                if previous is None:
+                    del sys.modules[__name__]
+                else:
+                    sys.modules[__name__] = previous
+        else:
+            results = [self._verify_file(filename) for filename in binaries]
+
+        for findings in results:
+            for finding in findings:
+                getattr(self._output, finding.severity)(finding.message)
+        if self._cache and binaries:
+            self._cache.evict()
+        if skipped:
+            self._output.info("skipped %s files (%s)" % (sum(skipped.values()), ", ".join(
+                "%s: %s" % (category, count) for category, count in sorted(skipped.items()))))
+
+    def _report(self, check, severity, message):
+        self._findings.append(Finding(self._filename, check, severity, message))
 
     def _verify_file(self, filename):
+        """ Findings of the file, in the order they are found. They are taken from the cache,
+            if enabled, when the same binary was checked before with the same settings
+        """
+        if not self._cache:
+            return self._lint_file(filename)
+        key = hashlib.sha256(json.dumps([file_digest(filename)] + self._cache_settings)
+                             .encode()).hexdigest()
+        verdict = self._cache.get(key)
+        if verdict is None:
+            findings = self._lint_file(filename)
+            # The messages contain the path of the binary, but the same binary can be anywhere
+            self._cache.put(key, [[f.check, f.severity, f.message.split(filename)] for f in findings])
+            return findings
+        return [Finding(filename, check, severity, filename.join(message))
+                for check, severity, message in verdict]
+
+    def _lint_file(self, filename):
         self._filename = filename
-        self._binary = lief.parse(filename)
+        self._findings = []
+        if binary_format(filename) == "archive":  # lief cannot read static libraries
+            self._verify_archive()
+            findings, self._findings = self._findings, []
+            return findings
+        # lief parses the whole binary (symbols, relocations, debug info...), only needed when
+        # the headers cannot be read directly
+        self._binary = read_headers(filename) or parse_headers(filename)
 
         if not self._binary:
-            return
+            return self._findings
 
         if self._binary.format != self._expected_format:
-            self._output.error('"%s" invalid executable format %s, expected %s'
-                               % (self._filename, self._binary.format, self._expected_format))
-            return
+            self._report("format", "error", '"%s" invalid executable format %s, expected %s'
+                         % (self._filename, self._binary.format, self._expected_format))
+            return self._findings
 
-        self._binary = self._binary.concrete
-        self._output.info('checking file "%s"' % filename)
+        self._report("format", "info", 'checking file "%s"' % filename)
 
         {
             lief.EXE_FORMATS.ELF: self._verify_elf,
@@ -69,19 +445,39 @@ class BinaryLinter(object):
             lief.EXE_FORMATS.MACHO: self._verify_macho
         }.get(self._binary.format)()
 
-        if self._shared is not None and not self._shared:
+        if self._shared is not None and not self._shared and not self._binary.slices:
             if self._is_shared_library:
-                self._output.error('"%s" is shared library, but option "shared" is set to "False"' % self._filename)
+                self._report("shared", "error",
+                             '"%s" is shared library, but option "shared" is set to "False"' % self._filename)
+        findings, self._findings, self._binary = self._findings, [], None
+        return findings
+
+    def _verify_archive(self):
+        """ Checks the format and the machine of the objects in a static library, up to the first
+            wrong one. Only the first bytes of each object are read
+        """
+        expected_format = ARCHIVE_FORMATS[self._expected_format]
+        expected_machines = OBJECT_MACHINES[expected_format].get(self._arch)
+        self._report("format", "info", 'checking archive "%s"' % self._filename)
+        with open(self._filename, "rb") as f:
+            for name, size in ar_members(f):
+                member = object_machine(f.read(min(size, 64)))
+                if member is None:  # Not an object file, e.g. LLVM bitcode
+                    continue
+                format_, machine = member
+                if format_ != expected_format:
+                    self._report("format", "error", '"%s" member "%s" invalid object format %s, expected %s'
+                                 % (self._filename, name, format_, expected_format))
+                    return
+                if expected_machines and machine not in expected_machines:
+                    self._report("arch", "error", '"%s" member "%s" invalid machine type %s, expected %s'
+                                 % (self._filename, name, hex(machine),
+                                    ", ".join(hex(it) for it in expected_machines)))
+                    return
 
     @property
     def _is_shared_library(self):
-        if self._binary.format == lief.EXE_FORMATS.ELF:
-            return self._binary.header.file_type == lief.ELF.E_TYPE.DYNAMIC
-        elif self._binary.format == lief.EXE_FORMATS.PE:
-            return self._binary.header.has_characteristic(lief.PE.HEADER_CHARACTERISTICS.DLL)
-        elif self._binary.format == lief.EXE_FORMATS.MACHO:
-            return self._binary.header.file_type == lief.MachO.FILE_TYPES.DYLIB
-        return False
+        return self._binary.shared
 
     def _verify_elf(self):
         expected_machine_type = {'x86': lief.ELF.ARCH.i386,
@@ -102,9 +498,9 @@ class BinaryLinter(object):
                                  'mips': lief.ELF.ARCH.MIPS,
                                  'mips64': lief.ELF.ARCH.MIPS}.get(self._arch, None)
 
-        if self._binary.header.machine_type != expected_machine_type:
-            self._output.error('"%s" invalid machine type %s, expected %s'
-                               % (self._filename, expected_machine_type, self._binary.header.machine_type))
+        if self._binary.machine != expected_machine_type:
+            self._report("arch", "error", '"%s" invalid machine type %s, expected %s'
+                         % (self._filename, self._binary.machine, expected_machine_type))
 
     def _verify_pe(self):
         expected_machine_type = {'x86': lief.PE.MACHINE_TYPES.I386,
@@ -116,51 +512,56 @@ class BinaryLinter(object):
                                  'armv7hf': lief.PE.MACHINE_TYPES.ARM,
                                  'armv8': lief.PE.MACHINE_TYPES.ARM}.get(self._arch, None)  # FIXME : ARM64
 
-        if self._binary.header.machine != expected_machine_type:
-            self._output.error('"%s" invalid machine type %s, expected %s'
-                               % (self._filename, expected_machine_type, self._binary.header.machine))
+        if self._binary.machine != expected_machine_type:
+            self._report("arch", "error", '"%s" invalid machine type %s, expected %s'
+                         % (self._filename, self._binary.machine, expected_machine_type))
 
+        self._imports = {name.lower() for name in self._binary.imports}
+        expected_imports = collections.OrderedDict()
         if self._compiler == 'Visual Studio':
-            self._verify_runtime()
-        self._check_import("cygwin1.dll", self._subsystem == "cygwin")
-        self._check_import("msys-1.0.dll", self._subsystem == "msys")
-        self._check_import("msys-2.0.dll", self._subsystem == "msys2")
+            expected_imports.update(self._expected_runtime_imports())
+        expected_imports["cygwin1.dll"] = self._subsystem == "cygwin"
+        expected_imports["msys-1.0.dll"] = self._subsystem == "msys"
+        expected_imports["msys-2.0.dll"] = self._subsystem == "msys2"
+        self._check_imports(expected_imports)
 
     def _has_import(self, name):
-        for i in self._binary.imports:
-            if i.name.lower() == name:
-                return True
-        return False
-
-    def _check_import(self, library, expected):
-        if self._has_import(library):
-            if not expected:
-                self._output.warn('"%s" imports library "%s"' % (self._filename, library))
-            else:
-                self._output.info('"%s" imports library "%s"' % (self._filename, library))
-        elif not self._has_import(library):
-            if expected:
-                self._output.error('"%s" doesn\'t import library "%s"' % (self._filename, library))
+        return name in self._imports
+
+    def _check_imports(self, expected_imports):
+        """ Reports the libraries imported but not expected and the other way round, the
+            rest of them are reported in a single message for the binary
+        """
+        imported, not_imported = [], []
+        for library, expected in expected_imports.items():
+            if self._has_import(library):
+                if not expected:
+                    self._report("import", "warn", '"%s" imports library "%s"' % (self._filename, library))
+                else:
+                    imported.append(library)
+            elif expected:
+                self._report("import", "error", '"%s" doesn\'t import library "%s"' % (self._filename, library))
             else:
-                self._output.info('"%s" doesn\'t import library "%s"' % (self._filename, library))
+                not_imported.append(library)
+        if imported:
+            self._report("import", "info", '"%s" imports libraries "%s"' % (self._filename, '", "'.join(imported)))
+        if not_imported:
+            self._report("import", "info", '"%s" doesn\'t import libraries "%s"'
+                         % (self._filename, '", "'.join(not_imported)))
 
-    @property
-    def _runtime_libraries(self):
-        def runtime_name(version):
-            return 'msvcr%s0' % version if version < 14 else 'vcruntime140'
-
-        return {str(version): {'MDd': runtime_name(version) + 'd.dll',
-                               'MD': runtime_name(version) + '.dll'} for version in range(8, 17)}
-
-    def _verify_runtime(self):
-        for version in self._runtime_libraries:
-            for runtime in self._runtime_libraries[version]:
-                library = self._runtime_libraries[version][runtime]
-                compiler_version = str(self._compiler_version)
-                expected = self._runtime_libraries[compiler_version].get(self._compiler_runtime)
-                expected = library == expected
-                expected = expected and "MT" not in self._compiler_runtime
-                self._check_import(library, expected)
+    def _expected_runtime_imports(self):
+        """ Whether each runtime library is expected to be imported, for the compiler settings.
+            Nothing is checked for the versions whose runtime is not known
+        """
+        if str(self._compiler_version) not in RUNTIME_LIBRARIES:
+            self._report("import", "warn", '"%s" runtime library of Visual Studio %s is unknown, '
+                         'the runtime imports are not checked' % (self._filename, self._compiler_version))
+            return collections.OrderedDict()
+        expected = RUNTIME_LIBRARIES[str(self._compiler_version)].get(self._compiler_runtime)
+        if "MT" in str(self._compiler_runtime):
+            expected = None
+        return collections.OrderedDict((library, library == expected)
+                                       for library in RUNTIME_LIBRARY_NAMES)
 
     def _verify_macho(self):
         expected_machine_type = {'x86': lief.MachO.CPU_TYPES.x86_64,
@@ -174,12 +575,68 @@ class BinaryLinter(object):
                                  'armv7s': lief.MachO.CPU_TYPES.ARM,
                                  'armv7k': lief.MachO.CPU_TYPES.ARM,
                                  'armv7hf': lief.MachO.CPU_TYPES.ARM,
-                                 'armv8': lief.MachO.CPU_TYPES.ARM}.get(self._arch, None)
-        if self._binary.header.cpu_type != expected_machine_type:
-            self._output.error('"%s" invalid machine type %s, expected %s'
-                               % (self._filename, expected_machine_type, self._binary.header.machine))
+                                 'armv8': lief.MachO.CPU_TYPES.ARM64}
+        if not self._binary.slices:
+            expected_machine_type = expected_machine_type.get(self._arch, None)
+            if self._binary.machine != expected_machine_type:
+                self._report("arch", "error", '"%s" invalid machine type %s, expected %s'
+                             % (self._filename, self._binary.machine, expected_machine_type))
+            return
+
+        # Universal binaries, e.g. for arch=armv8|x86_64, need a slice for each architecture
+        expected_machine_types = [expected_machine_type.get(arch) for arch in str(self._arch).split("|")]
+        for index, slice_ in enumerate(self._binary.slices):
+            if slice_.machine not in expected_machine_types:
+                self._report("arch", "error", '"%s" slice %s invalid machine type %s, expected %s'
+                             % (self._filename, index, slice_.machine,
+                                " or ".join(str(it) for it in expected_machine_types)))
+            else:
+                self._report("arch", "info", '"%s" slice %s (%s) OK' % (self._filename, index, slice_.machine))
+        for machine_type in expected_machine_types:
+            if machine_type not in [slice_.machine for slice_ in self._binary.slices]:
+                self._report("arch", "error", '"%s" has no slice for machine type %s'
+                             % (self._filename, machine_type))
+
+        # A shared library needs a dylib in every slice, other binaries none
+        if self._shared is not None and not self._shared:
+            expected_file_type = None
+        elif self._binary.shared:
+            expected_file_type = lief.MachO.FILE_TYPES.DYLIB
+        else:
+            return
+        for index, slice_ in enumerate(self._binary.slices):
+            if expected_file_type is None and slice_.shared:
+                self._report("shared", "error", '"%s" slice %s is shared library, but option "shared" is set to "False"'
+                             % (self._filename, index))
+            elif expected_file_type is not None and slice_.file_type != expected_file_type:
+                self._report("shared", "error", '"%s" slice %s invalid file type %s, expected %s'
+                             % (self._filename, index, slice_.file_type, expected_file_type))
 
 
 def post_package(output, conanfile, conanfile_path, **kwargs):
     binary_linter = BinaryLinter(output, conanfile, conanfile_path)
     binary_linter.verify()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Manage the cache of the binary linter hook")
+    parser.add_argument("command", choices=("info", "clear"),
+                        help="Print the number of entries and size of the cache, or remove them")
+    parser.add_argument("--cache-dir", default=os.getenv("CONAN_BINARY_LINTER_CACHE_DIR"),
+                        help="Cache folder (default: CONAN_BINARY_LINTER_CACHE_DIR)")
+    args = parser.parse_args(args)
+    if not args.cache_dir:
+        parser.error("no cache folder, set CONAN_BINARY_LINTER_CACHE_DIR or use --cache-dir")
+    if DiskCache is None:
+        parser.error("disk_cache.py is missing, copy it next to the hook")
+
+    cache = DiskCache(args.cache_dir, None)
+    if args.command == "clear":
+        cache.evict(max_size=0)
+    entries = cache.entries()
+    print("%s: %s entries, %.2f MB" % (args.cache_dir, len(entries),
+                                        sum(size for _, size, _ in entries) / 1024.0 / 1024.0))
+
+
+if __name__ == "__main__":
+    main()
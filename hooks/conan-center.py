@@ -1,24 +1,48 @@
 import ast
 import collections
+import cProfile
+import json
 
+import contextlib
 import fnmatch
-import glob
+import hashlib
 import inspect
+import mmap
 import os
 import platform
 import re
+import struct
 import sys
 import subprocess
+import tempfile
+import threading
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from logging import WARNING, ERROR, INFO, DEBUG, NOTSET
 
 import yaml
 from conan.tools.apple import is_apple_os
 from conan.tools.files import collect_libs
 from conans import tools
+from conans import __version__ as conan_version
 from conans.client.graph.python_requires import ConanPythonRequire
 from conans.client.loader import parse_conanfile
 from conans.util.runners import check_output_runner
+
+try:
+    from disk_cache import get_cache
+except ImportError:  # Installed without disk_cache.py, the results are not cached
+    def get_cache(folder_variable, size_variable):
+        return None
+try:
+    from yaml_documents import dump_yml, load_yml as _load_yml
+except ImportError:  # Installed without yaml_documents.py, documents are parsed every time
+    def _load_yml(path, load):
+        return yaml.safe_load(load(path)) if os.path.isfile(path) else None
+
+    def dump_yml(data):
+        return yaml.safe_dump(data, default_flow_style=False)
 try:
     from conans import Settings
 except ImportError:
@@ -108,6 +132,9 @@ class _HooksOutputErrorCollector(object):
         if self.kb_id:
             self.kb_url = kb_url(self.kb_id)
         self._error_level = int(os.getenv("CONAN_HOOK_ERROR_LEVEL", str(NOTSET)))
+        self.scheduler = None
+        self.stats = None
+        self.result_cache = None
 
     def _get_message(self, message):
         if self._test_name:
@@ -137,6 +164,9 @@ class _HooksOutputErrorCollector(object):
         else:
             self._output.warning(self._get_message(message))
 
+    def warning(self, message):
+        self.warn(message)
+
     def error(self, message):
         self._error = True
         url_str = '({})'.format(self.kb_url) if self.kb_id else ""
@@ -154,10 +184,170 @@ class _HooksOutputErrorCollector(object):
             raise Exception("Some checks failed running the hook, check the output")
 
 
+class _BufferedOutput(object):
+    """ Keeps the messages of a check running in the thread pool, so they can be
+        printed later following the order in which the checks were declared
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def _write(self, method, message):
+        self.messages.append((method, message))
+
+    def success(self, message):
+        self._write("success", message)
+
+    def debug(self, message):
+        self._write("debug", message)
+
+    def info(self, message):
+        self._write("info", message)
+
+    def warn(self, message):
+        self._write("warn", message)
+
+    def error(self, message):
+        self._write("error", message)
+
+    def replay(self, output):
+        _replay(self.messages, output)
+
+
+class _RecordingOutput(_BufferedOutput):
+    """ Writes the messages of a check to the output and keeps them to store them in the cache """
+
+    def __init__(self, output):
+        super(_RecordingOutput, self).__init__()
+        self._output = output
+
+    def _write(self, method, message):
+        super(_RecordingOutput, self)._write(method, message)
+        getattr(self._output, method)(message)
+
+
+def _replay(messages, output):
+    for method, message in messages:
+        getattr(output, method)(message)
+
+
+class _ChecksScheduler(object):
+    """ Runs the checks of a hook phase in a thread pool. Their output is buffered
+        and flushed in declaration order, and the first exception (in the same order)
+        is raised after the output of the checks declared before it
+    """
+
+    def __init__(self, output, jobs):
+        self._output = output
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+        self._checks = []
+
+    def submit(self, kb_id, func, stats, result_cache=None, inputs=None):
+        buffered_output = _BufferedOutput()
+        future = self._executor.submit(_run_check, kb_id, buffered_output, func, stats,
+                                       result_cache, inputs)
+        self._checks.append((future, buffered_output))
+
+    def flush(self):
+        checks, self._checks = self._checks, []
+        try:
+            for future, buffered_output in checks:
+                exception = future.exception()
+                buffered_output.replay(self._output)
+                if exception:
+                    for pending, _ in checks:
+                        pending.cancel()
+                    raise exception
+        finally:
+            self._executor.shutdown(wait=True)
+
+
+def _get_jobs():
+    return int(os.getenv("CONAN_HOOK_JOBS", "1"))
+
+
+class _CheckStats(object):
+    """ Cost of a check, or of a whole hook phase when there is no 'kb_id' """
+
+    def __init__(self, phase, kb_id=None):
+        self.phase = phase
+        self.kb_id = kb_id
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.files = 0
+        self.bytes = 0
+        self.cached = False
+        self.checks = []
+
+    def as_dict(self, reference):
+        return {"reference": reference, "phase": self.phase, "kb_id": self.kb_id,
+                "wall": self.wall, "cpu": self.cpu, "files": self.files, "bytes": self.bytes,
+                "cached": self.cached}
+
+
+_current_stats = threading.local()
+# CPU time of the current thread is not available in Python 3.6
+_thread_time = getattr(time, "thread_time", time.process_time)
+
+
+def _record_io(files=0, size=0):
+    """ Account files and bytes read to the check (or phase) running in this thread """
+    stats = getattr(_current_stats, "stats", None)
+    if stats is not None:
+        stats.files += files
+        stats.bytes += size
+
+
+def load_yml(path):
+    return _load_yml(path, _load)
+
+
+def _load(path):
+    content = tools.load(path)
+    _record_io(files=1, size=len(content))
+    return content
+
+
+def _report_stats(output, stats, reference):
+    if os.getenv("CONAN_HOOK_TIMING"):
+        output.info("[TIMING] {}(): {:.3f} ms wall, {:.3f} ms CPU ({} files, {} bytes outside checks)"
+                    .format(stats.phase, stats.wall * 1000, stats.cpu * 1000, stats.files, stats.bytes))
+        for check in sorted(stats.checks, key=lambda it: (-it.wall, it.kb_id)):
+            output.info("[TIMING]   {} {:>10.3f} ms wall {:>10.3f} ms CPU {:>7} files {:>11} bytes{}"
+                        .format(check.kb_id, check.wall * 1000, check.cpu * 1000, check.files,
+                                check.bytes, " (cached)" if check.cached else ""))
+    timing_file = os.getenv("CONAN_HOOK_TIMING_FILE")
+    if timing_file:
+        lines = [json.dumps(it.as_dict(reference)) for it in [stats] + stats.checks]
+        with open(timing_file, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+
 def raise_if_error_output(func):
     def wrapper(output, *args, **kwargs):
         output = _HooksOutputErrorCollector(output)
-        ret = func(output, *args, **kwargs)
+        output.stats = _CheckStats(func.__name__)
+        reference = kwargs.get("reference") or kwargs.get("conanfile")
+        reference = str(reference) if reference is not None else None
+        jobs = _get_jobs()
+        if jobs > 1:
+            output.scheduler = _ChecksScheduler(output, jobs)
+        _current_stats.stats = output.stats
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            output.result_cache = _get_phase_cache(func.__name__, reference, kwargs)
+            ret = func(output, *args, **kwargs)
+        finally:
+            try:
+                if jobs > 1:
+                    output.scheduler.flush()
+                if output.result_cache:
+                    output.result_cache.evict()
+            finally:
+                _current_stats.stats = None
+                output.stats.wall = time.perf_counter() - wall
+                output.stats.cpu = time.process_time() - cpu
+        _report_stats(output, output.stats, reference)
         output.raise_if_error()
         return ret
 
@@ -168,31 +358,397 @@ def kb_url(kb_id):
     return "https://github.com/conan-io/conan-center-index/blob/master/docs/error_knowledge_base.md#{}-{}".format(kb_id, kb_errors[kb_id].replace(' ', '-'))
 
 
-def run_test(kb_id, output):
+def run_test(kb_id, output, inputs=None):
+    """ Runs the check decorated. 'inputs' lists everything the result of the check depends on
+        (besides the reference): "recipe", "test_package", "conandata", "config" and
+        "recipe_folder". Only checks declaring them can be replayed from the result cache, so
+        leave it empty for checks with side effects or other inputs.
+    """
     def tmp(func):
+        phase_stats = getattr(output, "stats", None)
+        stats = _CheckStats(phase_stats.phase if phase_stats else None, kb_id)
+        if phase_stats:
+            phase_stats.checks.append(stats)
+        result_cache = getattr(output, "result_cache", None) if inputs else None
+        scheduler = getattr(output, "scheduler", None)
+        if scheduler:
+            scheduler.submit(kb_id, func, stats, result_cache, inputs)
+            return None
+        return _run_check(kb_id, output, func, stats, result_cache, inputs)
+
+    return tmp
+
+
+def _run_check(kb_id, output, func, stats, result_cache=None, inputs=None):
+    previous_stats = getattr(_current_stats, "stats", None)
+    _current_stats.stats = stats
+    wall, cpu = time.perf_counter(), _thread_time()
+    out = None
+    try:
+        profile = kb_id == os.getenv("CONAN_HOOK_PROFILE")
+        cache_key = result_cache.key(kb_id, inputs) if result_cache and not profile else None
+        if cache_key:
+            messages = result_cache.get(cache_key)
+            if messages is not None:
+                stats.cached = True
+                _replay(messages, output)
+                return None
+            output = _RecordingOutput(output)
         out = _HooksOutputErrorCollector(output, kb_id)
-        try:
+        if profile:
+            ret = _profile_check(func, out, stats)
+        else:
             ret = func(out)
-            if not out.failed:
-                out.success("OK")
-            return ret
-        except Exception as e:
-            out.error("Exception raised from hook: {} (type={})".format(e, type(e).__name__))
-            raise
+        if not out.failed:
+            out.success("OK")
+        if cache_key:
+            result_cache.put(cache_key, output.messages)
+        return ret
+    except Exception as e:
+        out = out or _HooksOutputErrorCollector(output, kb_id)
+        out.error("Exception raised from hook: {} (type={})".format(e, type(e).__name__))
+        raise
+    finally:
+        stats.wall = time.perf_counter() - wall
+        stats.cpu = _thread_time() - cpu
+        _current_stats.stats = previous_stats
+
+
+class _PhaseCache(object):
+    """ Computes the keys of the checks of a hook method in the result cache: the hash of the
+        inputs they declare plus everything common to all of them (hook file, Conan and Python
+        versions, hook method, reference and the environment variables read by the checks).
+        The digest of every input is computed once.
+    """
+
+    environment = ("CONAN_HOOK_ERROR_LEVEL", "CONAN_MAX_RECIPE_FOLDER_SIZE_KB")
+
+    def __init__(self, cache, phase, reference, conanfile_path):
+        self._cache = cache
+        self._conanfile_path = conanfile_path
+        self._recipe_folder = os.path.dirname(conanfile_path)
+        self._digests = {}
+        common = [_hook_digest(), conan_version, sys.version.split()[0], phase, reference]
+        common += ["{}={}".format(name, os.getenv(name, "")) for name in self.environment]
+        self._common = "\n".join(str(it) for it in common)
+
+    # Stored instead of the recipe folder in the messages, as it is different in other checkouts
+    # or machines sharing the cache
+    recipe_folder_placeholder = "<recipe folder>"
+
+    def get(self, key):
+        messages = self._cache.get(key)
+        if messages is None:
+            return None
+        if self._recipe_folder:
+            messages = [(method, message.replace(self.recipe_folder_placeholder, self._recipe_folder))
+                        for method, message in messages]
+        return [tuple(message) for message in messages]
+
+    def put(self, key, messages):
+        if self._recipe_folder:
+            messages = [(method, message.replace(self._recipe_folder, self.recipe_folder_placeholder))
+                        for method, message in messages]
+        self._cache.put(key, messages)
+
+    def evict(self):
+        if self._cache.written:  # Nothing to remove when all the messages are replayed
+            self._cache.evict()
+
+    def key(self, kb_id, inputs):
+        """ None if the check cannot be cached """
+        try:
+            if self._digest("python_requires"):  # The recipe depends on other recipes
+                return None
+            sha = hashlib.sha256(self._common.encode("utf-8"))
+            sha.update(kb_id.encode("utf-8"))
+            for name in sorted(inputs):
+                sha.update("\n{}={}".format(name, self._digest(name)).encode("utf-8"))
+            return sha.hexdigest()
+        except (EnvironmentError, SyntaxError, ValueError):
+            return None
 
-    return tmp
+    def _digest(self, name):
+        if name not in self._digests:
+            self._digests[name] = getattr(self, "_digest_{}".format(name))()
+        return self._digests[name]
 
+    def _digest_python_requires(self):
+        attributes = recipe_sources.get(self._conanfile_path).index.class_attributes
+        return "python_requires" in attributes or "python_requires_extend" in attributes
+
+    def _digest_recipe(self):
+        return _sha256(recipe_sources.get(self._conanfile_path).content)
+
+    def _digest_test_package(self):
+        test_package = recipe_sources.test_package(self._conanfile_path)
+        return _sha256(test_package.content) if test_package else None
+
+    def _digest_conandata(self):
+        return _file_digest(os.path.join(self._recipe_folder, "conandata.yml"))
+
+    def _digest_config(self):
+        return _file_digest(os.path.join(self._recipe_folder, os.path.pardir, "config.yml"))
+
+    def _digest_recipe_folder(self):
+        # Names and sizes of the test_package outputs, which are never read by the checks
+        sha = hashlib.sha256()
+        for root, filenames in PackageTree(self._recipe_folder).walk():
+            skip_content = _skip_test_package(root, ".")
+            for filename in filenames:
+                path = os.path.join(self._recipe_folder, root, filename)
+                if skip_content or os.path.islink(path):
+                    digest = os.path.getsize(path) if os.path.exists(path) else os.readlink(path)
+                else:
+                    digest = _file_digest(path)
+                sha.update("{}/{}={}\n".format(root, filename, digest).encode("utf-8"))
+        return sha.hexdigest()
+
+
+def _sha256(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _file_digest(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        content = f.read()
+    _record_io(files=1, size=len(content))
+    return hashlib.sha256(content).hexdigest()
+
+
+def _hook_digest():
+    if not hasattr(this, "hook_digest"):
+        this.hook_digest = _file_digest(os.path.abspath(__file__))
+    return this.hook_digest
 
-def load_yml(path):
-    if os.path.isfile(path):
-        return yaml.safe_load(tools.load(path))
-    return None
+
+_result_caches = {}
+
+
+def _get_phase_cache(phase, reference, kwargs):
+    """ Result cache for the checks of a hook method, None if it is not enabled """
+    conanfile_path = kwargs.get("conanfile_path")
+    if not conanfile_path or phase not in ("pre_export", "post_export", "pre_source"):
+        return None
+    cache = get_cache("CONAN_HOOK_CACHE_DIR", "CONAN_HOOK_CACHE_SIZE")
+    if not cache:
+        return None
+    cache = _result_caches.setdefault(cache.folder, cache)
+    return _PhaseCache(cache, phase, reference, conanfile_path)
+
+
+def _profile_check(func, out, stats):
+    profile_path = os.getenv("CONAN_HOOK_PROFILE_FILE") or \
+                   os.path.join(tempfile.gettempdir(), "{}-{}.prof".format(stats.kb_id, stats.phase))
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, out)
+    finally:
+        profile.dump_stats(profile_path)
+        out.info("Profile saved to '{}'".format(profile_path))
+
+
+class RecipeSource(object):
+    """ Contents of a recipe file: text, lines and the AST, computed only once """
+
+    def __init__(self, path, content):
+        self.path = path
+        self.content = content
+        self._lines = None
+        self._tree = None
+        self._index = None
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            self._lines = self.content.splitlines()
+        return self._lines
+
+    @property
+    def tree(self):
+        """ Shared by all the checks, do not modify it. Raises SyntaxError """
+        if self._tree is None:
+            self._tree = ast.parse(self.content)
+        return self._tree
+
+    @property
+    def index(self):
+        """ RecipeAstIndex of the recipe, shared by all the checks. Raises SyntaxError """
+        if self._index is None:
+            self._index = RecipeAstIndex(self.tree)
+        return self._index
+
+
+RecipeCall = collections.namedtuple("RecipeCall", ("name", "args", "keywords", "lineno"))
+
+
+def _literal(node, default=None):
+    """ Value of a literal expression node, 'default' if it is not a literal """
+    if node is None:
+        return default
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError):
+        return default
+
+
+class RecipeAstIndex(ast.NodeVisitor):
+    """ Everything the checks look for in a recipe, collected in a single traversal of its AST,
+        so every check is a lookup instead of a scan of the text (and comments are ignored).
+
+        Names are dotted as they are written in the recipe: 'self.settings.compiler.rm_safe',
+        'tools.get', and calls are marked with '()': 'SystemPackageTool().install'.
+    """
+
+    def __init__(self, tree):
+        self.class_attributes = {}  # name -> value node, for attributes declared in a class body
+        self.module_assignments = {}  # name -> value node, for module level assignments
+        self.methods = {}  # name -> FunctionDef node, for functions declared in a class body
+        self.calls = collections.defaultdict(list)  # dotted name -> [RecipeCall]
+        self.assignments = collections.defaultdict(list)  # dotted target -> [value nodes]
+        self.deletions = set()  # dotted targets of 'del' statements
+        self.subscripts = collections.defaultdict(set)  # dotted name -> constant keys used
+        self.imports = set()  # dotted names of the modules and the imported names
+        self.strings = []  # (line, value) of every string constant
+        self.visit(tree)
+
+    @staticmethod
+    def dotted(node):
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            value = RecipeAstIndex.dotted(node.value)
+            return "{}.{}".format(value, node.attr) if value else None
+        if isinstance(node, ast.Call):
+            func = RecipeAstIndex.dotted(node.func)
+            return "{}()".format(func) if func else None
+        return None
+
+    def calls_to(self, *names):
+        return [call for name in names for call in self.calls.get(name, [])]
+
+    def removes_setting(self, setting):
+        """ Whether the recipe deletes 'setting' ("compiler.libcxx") from self.settings """
+        parent, _, child = setting.rpartition(".")
+        if "self.settings.{}".format(setting) in self.deletions:
+            return True
+        if any(call.args and _literal(call.args[0]) == setting
+               for call in self.calls_to("self.settings.rm_safe")):
+            return True
+        return bool(parent) and any(call.args and _literal(call.args[0]) == child
+                              for call in self.calls_to("self.settings.{}.rm_safe".format(parent)))
+
+    @staticmethod
+    def _assigned_names(node):
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        return [target.id for target in targets if isinstance(target, ast.Name)]
+
+    def visit_Module(self, node):
+        for statement in node.body:
+            if isinstance(statement, (ast.Assign, ast.AnnAssign)):
+                for name in self._assigned_names(statement):
+                    self.module_assignments[name] = statement.value
+        self.generic_visit(node)
+
+    def visit_ClassDef(self, node):
+        for statement in node.body:
+            if isinstance(statement, (ast.Assign, ast.AnnAssign)):
+                for name in self._assigned_names(statement):
+                    self.class_attributes[name] = statement.value
+            elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.methods[statement.name] = statement
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        for target in node.targets:
+            name = self.dotted(target)
+            if name:
+                self.assignments[name].append(node.value)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node):
+        name = self.dotted(node.target)
+        if name and node.value is not None:
+            self.assignments[name].append(node.value)
+        self.generic_visit(node)
+
+    def visit_Delete(self, node):
+        for target in node.targets:
+            name = self.dotted(target)
+            if name:
+                self.deletions.add(name)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        name = self.dotted(node.func)
+        if name:
+            keywords = {keyword.arg: keyword.value for keyword in node.keywords if keyword.arg}
+            self.calls[name].append(RecipeCall(name, node.args, keywords, node.lineno))
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        name = self.dotted(node.value)
+        key = node.slice.value if isinstance(node.slice, getattr(ast, "Index", ())) else node.slice
+        key = _literal(key)
+        if name and isinstance(key, str):
+            self.subscripts[name].add(key)
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        self.imports.update(alias.name for alias in node.names)
+
+    def visit_ImportFrom(self, node):
+        module = "." * node.level + (node.module or "")
+        self.imports.add(module)
+        self.imports.update("{}.{}".format(module, alias.name) for alias in node.names)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str):
+            self.strings.append((node.lineno, node.value))
+
+    def visit_Str(self, node):  # Python < 3.8
+        self.strings.append((node.lineno, node.s))
+
+
+class RecipeSources(object):
+    """ Per process cache of the recipe files (conanfile.py and test_package/conanfile.py),
+        so they are read and parsed once for all the checks of every hook method. The
+        entries are invalidated when the modification time or the size of the file change.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._sources.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        source = RecipeSource(path, _load(path))
+        with self._lock:
+            self._sources[path] = (key, source)
+        return source
+
+    def test_package(self, conanfile_path):
+        """ The test_package/conanfile.py next to the recipe, None if it doesn't exist """
+        path = os.path.join(os.path.dirname(conanfile_path), "test_package", "conanfile.py")
+        return self.get(path) if os.path.isfile(path) else None
+
+
+recipe_sources = RecipeSources()
 
 
 @raise_if_error_output
 def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
     this.reference = str(reference)
-    conanfile_content = tools.load(conanfile_path)
+    recipe = recipe_sources.get(conanfile_path)
+    conanfile_content = recipe.content
     export_folder_path = os.path.dirname(conanfile_path)
     settings = _get_settings(conanfile)
     header_only = _is_recipe_header_only(conanfile)
@@ -200,20 +756,20 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
 
     output.warning("DEPRECATED!!! This hook is no longer used by conan-center-index and is incompatible with Conan 2.0.")
 
-    @run_test("KB-H001", output)
+    @run_test("KB-H001", output, inputs=("recipe",))
     def test(out):
         if settings and "cppstd" in settings:
             out.error("The 'cppstd' setting is deprecated. Use the 'compiler.cppstd' "
                       "subsetting instead")
 
-    @run_test("KB-H002", output)
+    @run_test("KB-H002", output, inputs=("recipe",))
     def test(out):
         if reference.name != reference.name.lower():
             out.error("The library name has to be lowercase")
         if reference.version != str(reference.version).lower():
             out.error("The library version has to be lowercase")
 
-    @run_test("KB-H003", output)
+    @run_test("KB-H003", output, inputs=("recipe",))
     def test(out):
         def _message_attr(attributes, out_method):
             for field in attributes:
@@ -221,33 +777,33 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                 if not field_value:
                     out_method("Conanfile doesn't have '%s' attribute. " % field)
 
-        if not re.search(r"(\s{4}|\t)name\s*=", conanfile_content):
+        if "name" not in recipe.index.class_attributes:
             out.error("Conanfile doesn't have 'name' attribute.")
         _message_attr(["url", "license", "description", "homepage", "topics"], out.error)
 
-    @run_test("KB-H005", output)
+    @run_test("KB-H005", output, inputs=("recipe",))
     def test(out):
         no_copy_source = getattr(conanfile, "no_copy_source", None)
         if not settings and header_only and not no_copy_source:
             out.warn("This recipe is a header only library as it does not declare "
                      "'settings'. Please include 'no_copy_source' to avoid unnecessary copy steps")
 
-    @run_test("KB-H006", output)
+    @run_test("KB-H006", output, inputs=("recipe",))
     def test(out):
         options = getattr(conanfile, "options", None)
         if settings and options and not header_only and "fPIC" not in options and not installer:
             out.warn("This recipe does not include an 'fPIC' option. Make sure you are using the "
                      "right casing")
 
-    @run_test("KB-H008", output)
+    @run_test("KB-H008", output, inputs=("recipe",))
     def test(out):
-        # This regex takes advantage that a conan reference is always a string
-        vrange_match = re.compile(r'.*[\'"][a-zA-Z0-9_+.-]+/\[.+\]@[a-zA-Z0-9_+./-]+[\'"].*')
-        for num, line in enumerate(conanfile_content.splitlines(), 1):
-            if vrange_match.match(line):
-                out.error("Possible use of version ranges, line %s:\n %s" % (num, line))
+        # A conan reference is always a string
+        vrange_match = re.compile(r'[a-zA-Z0-9_+.-]+/\[.+\]@[a-zA-Z0-9_+./-]+')
+        lines = sorted({num for num, value in recipe.index.strings if vrange_match.fullmatch(value)})
+        for num in lines:
+            out.error("Possible use of version ranges, line %s:\n %s" % (num, recipe.lines[num - 1]))
 
-    @run_test("KB-H009", output)
+    @run_test("KB-H009", output, inputs=("recipe", "recipe_folder"))
     def test(out):
         allowlist = ("boost",)
         if conanfile.name in allowlist:
@@ -266,6 +822,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                 file_path = os.path.join(path, files_it)
                 if not os.path.islink(file_path):
                     total_size += os.path.getsize(file_path)
+                    _record_io(files=1)
 
         total_size_kb = total_size / 1024
         out.success("Total recipe size: %s KB" % total_size_kb)
@@ -273,7 +830,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
             out.error("The size of your recipe folder ({} KB) is larger than the maximum allowed"
                       " size ({}KB).".format(total_size_kb, max_folder_size))
 
-    @run_test("KB-H023", output)
+    @run_test("KB-H023", output, inputs=("recipe",))
     def test(out):
         for attr_it in ["exports", "exports_sources"]:
             exports = getattr(conanfile, attr_it, None)
@@ -287,7 +844,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                         out.error("This recipe is exporting a license file. "
                                   "Remove %s from `%s`" % (exports_it, attr_it))
 
-    @run_test("KB-H024", output)
+    @run_test("KB-H024", output, inputs=("recipe_folder",))
     def test(out):
         dir_path = os.path.dirname(conanfile_path)
         test_package_path = os.path.join(dir_path, "test_package")
@@ -296,7 +853,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
         elif not os.path.exists(os.path.join(test_package_path, "conanfile.py")):
             out.error("There is no 'conanfile.py' in 'test_package' folder")
 
-    @run_test("KB-H025", output)
+    @run_test("KB-H025", output, inputs=("recipe",))
     def test(out):
         def _search_for_metaline(from_line, to_line, lines):
             for index in range(from_line, to_line):
@@ -312,21 +869,21 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                     out.error("vim editor configuration detected in your recipe. "
                               "Remove the line {}".format(line_number))
 
-        conanfile_lines = conanfile_content.splitlines()
+        conanfile_lines = recipe.lines
         first_lines_range = 5 if len(conanfile_lines) > 5 else len(conanfile_lines)
         _search_for_metaline(0, first_lines_range, conanfile_lines)
 
         last_lines_range = len(conanfile_lines) - 3 if len(conanfile_lines) > 8 else len(conanfile_lines)
         _search_for_metaline(last_lines_range, len(conanfile_lines), conanfile_lines)
 
-    @run_test("KB-H027", output)
+    @run_test("KB-H027", output, inputs=("recipe",))
     def test(out):
         url = getattr(conanfile, "url", None)
         if url and not url.startswith("https://github.com/conan-io/conan-center-index"):
             out.error("The attribute 'url' should point to: "
                       "https://github.com/conan-io/conan-center-index")
 
-    @run_test("KB-H028", output)
+    @run_test("KB-H028", output, inputs=("recipe_folder",))
     def test(out):
         def _find_cmake_minimum(folder):
             for (root, _, filenames) in os.walk(folder):
@@ -335,7 +892,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                        (filename.endswith(".txt") or filename.endswith(".cmake")) and \
                        not _skip_test_package(root, folder):
                         cmake_path = os.path.join(root, filename)
-                        cmake_content = tools.load(cmake_path).lower()
+                        cmake_content = _load(cmake_path).lower()
                         for line in cmake_content.splitlines():
                             if line.startswith("#") or re.search(r"^\s+#", line) or len(line.strip()) == 0:
                                 continue
@@ -343,7 +900,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                                  "cmake_minimum_required (version" in line:
                                 break
                             else:
-                                file_path = os.path.join(os.path.relpath(root), filename)
+                                file_path = os.path.join(os.path.relpath(root, folder), filename)
                                 out.error("The CMake file '%s' must contain a minimum version "
                                           "declared at the beginning (e.g. cmake_minimum_required(VERSION 3.1.2))" %
                                           file_path)
@@ -351,32 +908,37 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
         dir_path = os.path.dirname(conanfile_path)
         _find_cmake_minimum(dir_path)
 
-    @run_test("KB-H029", output)
+    @run_test("KB-H029", output, inputs=("test_package",))
     def test(out):
-        test_package_path = os.path.join(export_folder_path, "test_package")
-        if not os.path.exists(os.path.join(test_package_path, "conanfile.py")):
+        test_package = recipe_sources.test_package(conanfile_path)
+        if not test_package:
             return
 
-        test_package_conanfile = tools.load(os.path.join(test_package_path, "conanfile.py"))
+        test_package_conanfile = test_package.content
         if "RunEnvironment" in test_package_conanfile and \
            not re.search(r"self\.run\(.*, run_environment=True\)", test_package_conanfile):
             out.error("The 'RunEnvironment()' build helper is no longer needed. "
                       "It has been integrated into the self.run(..., run_environment=True)")
 
-    @run_test("KB-H032", output)
+    @run_test("KB-H032", output, inputs=("recipe",))
     def test(out):
         if conanfile.version == "system":
             out.info("'system' versions are allowed to install system requirements.")
             return
-        if "def system_requirements" in conanfile_content and \
-           "SystemPackageTool" in conanfile_content:
-            import re
-            match = re.search(r'(\S+)\s?=\s?(tools.)?SystemPackageTool', conanfile_content)
-            if ("SystemPackageTool().install" in conanfile_content) or \
-               (match and "{}.install".format(match.group(1)) in conanfile_content):
-                out.error("The method 'SystemPackageTool.install' is not allowed in the recipe.")
+        index = recipe.index
+        if "system_requirements" in index.methods:
+            def _is_installer(name):
+                return bool(name) and name.rpartition(".")[2] == "SystemPackageTool()"
+
+            installers = {target for target, values in index.assignments.items()
+                          if any(_is_installer(index.dotted(value)) for value in values)}
+            for name in index.calls:
+                owner, _, method = name.rpartition(".")
+                if method == "install" and (owner in installers or _is_installer(owner)):
+                    out.error("The method 'SystemPackageTool.install' is not allowed in the recipe.")
+                    break
 
-    @run_test("KB-H030", output)
+    @run_test("KB-H030", output, inputs=("recipe", "conandata"))
     def test(out):
         conandata_path = os.path.join(export_folder_path, "conandata.yml")
         version = conanfile.version
@@ -473,17 +1035,16 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
             if not found_checksums and has_sources and not is_google_source:
                 out.error("The checksum key 'sha256' must be declared and can not be empty.")
 
-    @run_test("KB-H034", output)
+    @run_test("KB-H034", output, inputs=("test_package",))
     def test(out):
-        test_package_path = os.path.join(export_folder_path, "test_package")
-        if not os.path.exists(os.path.join(test_package_path, "conanfile.py")):
+        test_package = recipe_sources.test_package(conanfile_path)
+        if not test_package:
             return
 
-        test_package_conanfile = tools.load(os.path.join(test_package_path, "conanfile.py"))
-        if "def imports" in test_package_conanfile:
+        if "def imports" in test_package.content:
             out.error("The method `imports` is not allowed in test_package/conanfile.py")
 
-    @run_test("KB-H037", output)
+    @run_test("KB-H037", output, inputs=("recipe",))
     def test(out):
         author = getattr(conanfile, "author", None)
         if author:
@@ -491,7 +1052,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                 author = '"%s"' % author
             out.error("Conanfile should not contain author. Remove 'author = {}'".format(author))
 
-    @run_test("KB-H039", output)
+    @run_test("KB-H039", output, inputs=("recipe",))
     def test(out):
         allowed_list = {"openjdk"}
         search_attrs = ["scm", "build_policy"]
@@ -501,79 +1062,81 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
         for attr in search_attrs:
             if getattr(conanfile, attr, None):
                 forbidden_attrs.append(attr)
-        if re.search(r"revision_mode\s=", conanfile_content):
+        if "revision_mode" in recipe.index.class_attributes:
             forbidden_attrs.append("revision_mode")
 
         if forbidden_attrs:
             out.error("Conanfile should not contain attributes: '{}'"
                       .format(", ".join(forbidden_attrs)))
 
-    @run_test("KB-H040", output)
+    @run_test("KB-H040", output, inputs=("recipe",))
     def test(out):
-        match = re.search(r"self\.cpp_info\.(name|filename)\s?=", conanfile_content)
-        if match:
-            out.error("CCI uses the name of the package for cmake generator and filename by default."
-                      " Replace 'cpp_info.{0}' by 'cpp_info.{0}s[<generator>]'.".format(match.group(1)))
+        index = recipe.index
+        for attr in ("name", "filename"):
+            if "self.cpp_info.{}".format(attr) in index.assignments:
+                out.error("CCI uses the name of the package for cmake generator and filename by default."
+                          " Replace 'cpp_info.{0}' by 'cpp_info.{0}s[<generator>]'.".format(attr))
 
-        match = re.search(r"self\.cpp_info\.(names|filenames)\[\s?['\"](cmake|cmake_multi)['\"]\s?\]", conanfile_content)
-        if match:
-            out.error("CCI uses the name of the package for {0} generator. "
-                      "Conanfile should not contain 'self.cpp_info.{1}['{0}']'. "
-                      "Use 'cmake_find_package' and 'cmake_find_package_multi' instead.".format(match.group(2),
-                                                                                                 match.group(1)))
+        for attr in ("names", "filenames"):
+            for generator in ("cmake", "cmake_multi"):
+                if generator in index.subscripts.get("self.cpp_info.{}".format(attr), ()):
+                    out.error("CCI uses the name of the package for {0} generator. "
+                              "Conanfile should not contain 'self.cpp_info.{1}['{0}']'. "
+                              "Use 'cmake_find_package' and 'cmake_find_package_multi' instead."
+                              .format(generator, attr))
 
-    @run_test("KB-H044", output)
+    @run_test("KB-H044", output, inputs=("recipe",))
     def test(out):
         for forbidden in ["self.requires.add", "self.build_requires.add"]:
-            if forbidden in conanfile_content:
+            if recipe.index.calls_to(forbidden):
                 out.error("The method '{}()' is not allowed. Use '{}()' instead."
                           .format(forbidden, forbidden.replace(".add", "")))
 
-    @run_test("KB-H045", output)
+    @run_test("KB-H045", output, inputs=("recipe",))
     def test(out):
-        if "self.options.remove(" in conanfile_content:
+        if recipe.index.calls_to("self.options.remove"):
             out.error("Found 'self.options.remove'. Replace it by 'del self.options.<opt>'.")
 
-    @run_test("KB-H046", output)
+    @run_test("KB-H046", output, inputs=("recipe_folder",))
     def test(out):
+        dir_path = os.path.dirname(conanfile_path)
 
         def check_for_verbose_flag(cmakelists_path):
-            cmake_content = tools.load(cmakelists_path)
+            cmake_content = _load(cmakelists_path)
             if "cmake_verbose_makefile" in cmake_content.lower():
                 out.error("The CMake definition 'set(CMAKE_VERBOSE_MAKEFILE ON)' is not allowed. "
-                          "Remove it from {}.".format(os.path.relpath(cmakelists_path)))
+                          "Remove it from {}.".format(os.path.relpath(cmakelists_path, dir_path)))
 
-        dir_path = os.path.dirname(conanfile_path)
         test_package_path = os.path.join(dir_path, "test_package")
         for cmake_path in [os.path.join(dir_path, "CMakeLists.txt"),
                            os.path.join(test_package_path, "CMakeLists.txt")]:
             if os.path.exists(cmake_path):
                 check_for_verbose_flag(cmake_path)
 
-    @run_test("KB-H048", output)
+    @run_test("KB-H048", output, inputs=("recipe_folder",))
     def test(out):
         dir_path = os.path.dirname(conanfile_path)
         cmake_test_pkg = os.path.join(dir_path, "test_package", "CMakeLists.txt")
         if os.path.isfile(cmake_test_pkg):
-            cmake_content = tools.load(cmake_test_pkg)
+            cmake_content = _load(cmake_test_pkg)
             if re.search(r"cmake_minimum_required\(version [\"']?2", cmake_content.lower()):
                 out.error("The test_package/CMakeLists.txt requires CMake 3.1 at least."
                           " Update to 'cmake_minimum_required(VERSION 3.1)'.")
 
         cmake_path = os.path.join(dir_path, "CMakeLists.txt")
         if os.path.isfile(cmake_path):
-            cmake_content = tools.load(cmake_path)
+            cmake_content = _load(cmake_path)
             if re.search(r"cmake_minimum_required\(version [\"']?2", cmake_content.lower()) and \
                "cxx_standard" in cmake_content.lower():
                 out.error("The CMake definition CXX_STANDARD requires CMake 3.1 at least."
                           " Update to 'cmake_minimum_required(VERSION 3.1)'.")
 
-    @run_test("KB-H049", output)
+    @run_test("KB-H049", output, inputs=("recipe_folder",))
     def test(out):
         dir_path = os.path.dirname(conanfile_path)
         cmake_path = os.path.join(dir_path, "CMakeLists.txt")
         if os.path.isfile(cmake_path):
-            cmake_content = tools.load(cmake_path)
+            cmake_content = _load(cmake_path)
             match = re.search(r"cmake_minimum_required\s?\(VERSION (\d?\.?\d?\.?\d+)\)",
                               cmake_content, re.I)
             if match and tools.Version(match.group(1)) < "3.4":
@@ -584,13 +1147,13 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                                 .format(cmake_def))
                         break
 
-    @run_test("KB-H051", output)
+    @run_test("KB-H051", output, inputs=("recipe",))
     def test(out):
         default_options = getattr(conanfile, "default_options")
         if default_options and not isinstance(default_options, dict):
             out.error("Use a dictionary to declare 'default_options'")
 
-    @run_test("KB-H052", output)
+    @run_test("KB-H052", output, inputs=("conandata", "config"))
     def test(out):
         config_path = os.path.abspath(os.path.join(export_folder_path, os.path.pardir, "config.yml"))
         config_yml = load_yml(config_path)
@@ -619,7 +1182,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                           'version "{}".'.format(version, conandata_path, config_path, config_path,
                                                  version))
 
-    @run_test("KB-H053", output)
+    @run_test("KB-H053", output, inputs=("recipe", "test_package"))
     def test(out):
         def _is_private_import(line):
             if line in ["from conans.model import Generator"]:
@@ -633,21 +1196,19 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                     return True
             return False
 
-        def _check_private_imports(filename, content):
-            for num, line in enumerate(content.splitlines(), 1):
+        def _check_private_imports(filename, lines):
+            for num, line in enumerate(lines, 1):
                 if _is_private_import(line):
                     out.error("The file {} imports private conan API on line {}, "
                               "this is strongly discouraged.".format(filename, num))
                     out.error(line)
 
-        _check_private_imports("conanfile.py", conanfile_content)
-        test_package_dir = os.path.join(os.path.dirname(conanfile_path), "test_package")
-        test_package_path = os.path.join(test_package_dir, "conanfile.py")
-        if os.path.exists(test_package_path):
-            test_package_content = tools.load(test_package_path)
-            _check_private_imports("test_package/conanfile.py", test_package_content)
+        _check_private_imports("conanfile.py", recipe.lines)
+        test_package = recipe_sources.test_package(conanfile_path)
+        if test_package:
+            _check_private_imports("test_package/conanfile.py", test_package.lines)
 
-    @run_test("KB-H055", output)
+    @run_test("KB-H055", output, inputs=("recipe",))
     def test(out):
         for prefix in ["", "build_"]:
             if hasattr(conanfile, "{}requires".format(prefix)) and \
@@ -655,7 +1216,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                 out.error("Both '{0}requires' attribute and '{0}requirements()' method should not "
                           "be declared at same recipe.".format(prefix))
 
-    @run_test("KB-H057", output)
+    @run_test("KB-H057", output, inputs=("recipe", "test_package"))
     def test(out):
         def _check_content(content, path):
             if "os.rename" in content:
@@ -665,12 +1226,11 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                 out.warn("The 'tools.rename' in {} is outdated and may cause permission error on Windows."
                          " Use 'conan.tools.files.rename(self, src, dst)' instead.".format(path))
         _check_content(conanfile_content, "conanfile.py")
-        test_package_path = os.path.join(os.path.dirname(conanfile_path), "test_package", "conanfile.py")
-        if os.path.exists(test_package_path):
-            test_package_content = tools.load(test_package_path)
-            _check_content(test_package_content, "test_package/conanfile.py")
+        test_package = recipe_sources.test_package(conanfile_path)
+        if test_package:
+            _check_content(test_package.content, "test_package/conanfile.py")
 
-    @run_test("KB-H058", output)
+    @run_test("KB-H058", output, inputs=("recipe_folder",))
     def test(out):
         disallowed_chars = '<>:"/\\|?*%,; '
         recipe_folder = os.path.dirname(conanfile_path)
@@ -683,14 +1243,14 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                     out.error("The file '{}' ends with a dot. Please, remove the dot from the end."
                               .format(file, disallowed_chars))
 
-    @run_test("KB-H059", output)
+    @run_test("KB-H059", output, inputs=("recipe",))
     def test(out):
         class_name = type(conanfile).__name__
         if class_name in ("LibnameConan", "ConanFileDefault"):
             camel_name = "".join(s.title() for s in re.split("[^a-zA-Z0-9]", conanfile.name))
             out.warn("Class name '{}' is not allowed. For example, use '{}Conan' instead.".format(class_name, camel_name))
 
-    @run_test("KB-H060", output)
+    @run_test("KB-H060", output, inputs=("recipe_folder",))
     def test(out):
         ext_to_be_checked = [".cmake", ".conf", ".cfg", ".diff", ".md", ".patch", ".py", ".txt",
                              ".yml", ".am", ".xml", ".json", ".in", ".ac", ".tsx", ".tmx",
@@ -705,11 +1265,12 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                 if not any(filename.lower().endswith(ext) for ext in ext_to_be_checked):
                     continue
                 lines = open(os.path.join(root, filename), 'rb').readlines()
+                _record_io(files=1, size=sum(len(line) for line in lines))
                 if any(line.endswith(b'\r\n') for line in lines):
                     out.error("The file '{}' uses CRLF. Please, replace by LF."
                               .format(filename))
 
-    @run_test("KB-H061", output)
+    @run_test("KB-H061", output, inputs=("recipe", "test_package"))
     def test(out):
         allowlist = ("qt", "metal-cpp")
         if conanfile.name in allowlist:
@@ -750,14 +1311,15 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                         self.invalids.append(BuildInfo(Location(node.lineno, node.col_offset, getattr(node, "end_lineno", node.lineno), getattr(node, "end_col_offset", node.col_offset)), "platform", methods_stack_no_build_info_allowed[0]))
                 self.generic_visit(node)
 
-        to_test = [(conanfile_path, conanfile_content),]
-        test_conanfile_path = os.path.join(export_folder_path, "test_package", "conanfile.py")
-        if os.path.isfile(test_conanfile_path):
-            to_test.append((test_conanfile_path, tools.load(test_conanfile_path)))
+        to_test = [(conanfile_path, recipe),]
+        test_package = recipe_sources.test_package(conanfile_path)
+        if test_package:
+            to_test.append((os.path.join(export_folder_path, "test_package", "conanfile.py"),
+                            test_package))
 
-        for dut_conanfile_path, dut_conanfile_contents in to_test:
+        for dut_conanfile_path, dut_recipe in to_test:
             try:
-                node = ast.parse(dut_conanfile_contents)
+                node = dut_recipe.tree
             except SyntaxError:
                 out.error("A SyntaxError was thrown while parsing '{}'".format(dut_conanfile_path))
                 continue
@@ -768,7 +1330,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                     dut_conanfile_path, build_info.loc.line, build_info.what, build_info.func))
 
 
-    @run_test("KB-H062", output)
+    @run_test("KB-H062", output, inputs=("recipe", "test_package"))
     def test(out):
         def _check_content(content, path):
             if "tools.cross_building(self.settings)" in content:
@@ -776,13 +1338,13 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                          "in some scenarios. Consider using tools.cross_building(self).".format(path))
 
         _check_content(conanfile_content, "conanfile.py")
-        test_package_path = os.path.join(os.path.dirname(conanfile_path), "test_package",
-                                         "conanfile.py")
-        if os.path.exists(test_package_path):
-            test_package_content = tools.load(test_package_path)
-            _check_content(test_package_content, test_package_path)
+        test_package = recipe_sources.test_package(conanfile_path)
+        if test_package:
+            test_package_path = os.path.join(os.path.dirname(conanfile_path), "test_package",
+                                             "conanfile.py")
+            _check_content(test_package.content, test_package_path)
 
-    @run_test("KB-H064", output)
+    @run_test("KB-H064", output, inputs=("recipe",))
     def test(out):
         topics = getattr(conanfile, "topics")
         if topics and isinstance(topics, (list, tuple)):
@@ -795,32 +1357,26 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                     out.warn("The topic '{}' is invalid; even names and acronyms should be formatted "
                              "entirely in lowercase.".format(topic))
 
-    @run_test("KB-H065", output)
+    @run_test("KB-H065", output, inputs=("recipe",))
     def test(out):
-        def _find_required_conan_version(conanfile_content):
-            match = re.search(r"^\s*required_conan_version\s*=\s*[\"']>=\s*([\d\.]+)[\"']",
-                              conanfile_content, re.MULTILINE)
+        def _find_required_conan_version(index):
+            value = _literal(index.module_assignments.get("required_conan_version"))
+            match = re.match(r"^>=\s*([\d\.]+)$", value) if isinstance(value, str) else None
             if match:
                 return tools.Version(match.group(1))
             return None
 
-        conanfile_content = tools.load(conanfile_path)
-
-        found_strip_root = False
-        lines = conanfile_content.splitlines()
-        for idx, line in enumerate(lines):
-            # check current and next line
-            if 'tools.get' in line and any('strip_root=True' in l for l in lines[idx:idx+2]):
-                found_strip_root = True
+        found_strip_root = any(_literal(call.keywords.get("strip_root")) is True
+                               for call in recipe.index.calls_to("tools.get"))
 
-        version = _find_required_conan_version(conanfile_content)
+        version = _find_required_conan_version(recipe.index)
         required_version = tools.Version('1.33.0')
         if found_strip_root and (not version or version < required_version):
             out.warn("tools.get with strip_root=True is available since Conan {0}. "
                      "Please add `required_conan_version >= \"{0}\"`"
                      "".format(str(required_version)))
 
-    @run_test("KB-H068", output)
+    @run_test("KB-H068", output, inputs=("test_package",))
     def test(out):
         test_package_path = os.path.join(os.path.dirname(conanfile_path), "test_package", "conanfile.py")
         if os.path.isfile(test_package_path):
@@ -832,7 +1388,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
             except Exception as e:
                 out.warn("Invalid conanfile: {}".format(e))
 
-    @run_test("KB-H069", output)
+    @run_test("KB-H069", output, inputs=("test_package",))
     def test(out):
         test_package_path = os.path.join(os.path.dirname(conanfile_path), "test_package", "conanfile.py")
         if os.path.isfile(test_package_path):
@@ -845,7 +1401,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
                 out.warn("Invalid conanfile: {}".format(e))
 
 
-    @run_test("KB-H070", output)
+    @run_test("KB-H070", output, inputs=("recipe",))
     def test(out):
         # Don't enforce it for applications
         if getattr(conanfile, "package_type", None) == "application":
@@ -860,7 +1416,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
         else:
             out.warn("No 'settings' detected in your conanfile.py. Add 'settings' attribute and use 'package_id(self)' method to manage the package ID.")
 
-    @run_test("KB-H072", output)
+    @run_test("KB-H072", output, inputs=("recipe_folder",))
     def test(out):
         def _check_conanfile_content(content, path):
             patterns = [r'#\s*pylint\s*:\s*skip-file\s*', '#\s*pylint\s*:\s*disable-all\s*', '#\s*pylint\s*:\s*disable=']
@@ -872,16 +1428,15 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
         recipes = _get_files_following_patterns(recipe_folder, [r"conanfile.py", ])
         for recipe in recipes:
             recipe_path = os.path.join(recipe_folder, recipe)
-            recipe_content = tools.load(recipe_path)
-            _check_conanfile_content(recipe_content, recipe_path)
+            _check_conanfile_content(recipe_sources.get(recipe_path).content, recipe_path)
 
-    @run_test("KB-H075", output)
+    @run_test("KB-H075", output, inputs=("recipe",))
     def test(out):
-        match = re.search(r'(^|\n)\s*self.requires\(.*override=True.*\)', conanfile_content)
-        if match:
+        if any(_literal(call.keywords.get("override")) is True
+               for call in recipe.index.calls_to("self.requires")):
             out.error("self.requires('package/version', override=True) is forbidden, do not force override parameter.")
 
-    @run_test("KB-H078", output)
+    @run_test("KB-H078", output, inputs=("recipe_folder",))
     def test(out):
         conandata_path = os.path.join(export_folder_path, "conandata.yml")
         conandata_yml = load_yml(conandata_path)
@@ -929,11 +1484,11 @@ def post_export(output, conanfile, conanfile_path, reference, **kwargs):
             info[entry] = {}
             info[entry][version] = conandata_yml[entry][version]
         out.info("Saving conandata.yml: {}".format(info))
-        new_conandata_yml = yaml.safe_dump(info, default_flow_style=False)
+        new_conandata_yml = dump_yml(info)
         out.info("New conandata.yml contents: {}".format(new_conandata_yml))
         tools.save(conandata_path, new_conandata_yml)
 
-    @run_test("KB-H050", output)
+    @run_test("KB-H050", output, inputs=("recipe",))
     def test(out):
         allowlist = (
             "glib",
@@ -959,9 +1514,9 @@ def post_export(output, conanfile, conanfile_path, reference, **kwargs):
 @raise_if_error_output
 def pre_source(output, conanfile, conanfile_path, **kwargs):
     conandata_source = os.path.join(os.path.dirname(conanfile_path), "conandata.yml")
-    conanfile_content = tools.load(conanfile_path)
+    recipe = recipe_sources.get(conanfile_path)
 
-    @run_test("KB-H010", output)
+    @run_test("KB-H010", output, inputs=("recipe", "conandata"))
     def test(out):
         if conanfile.version == "system":
             return
@@ -969,21 +1524,15 @@ def pre_source(output, conanfile, conanfile_path, **kwargs):
             out.error("Create a file 'conandata.yml' file with the sources "
                       "to be downloaded.")
 
-        if "def source(self):" in conanfile_content:
+        index = recipe.index
+        if "source" in index.methods:
+            commands = [value for _, value in index.strings]
             invalid_content = ["git checkout master", "git checkout devel", "git checkout develop"]
-            if "git clone" in conanfile_content and "git checkout" in conanfile_content:
-                fixed_sources = True
-                for invalid in invalid_content:
-                    if invalid in conanfile_content:
-                        fixed_sources = False
-                        break
+            if any("git clone" in it for it in commands) and any("git checkout" in it for it in commands):
+                fixed_sources = not any(invalid in it for it in commands for invalid in invalid_content)
             else:
-                fixed_sources = True
-                if ('**self.conan_data["sources"]' not in conanfile_content and
-                    'tools.get' not in conanfile_content) and \
-                   ('self.conan_data["sources"]' not in conanfile_content and
-                    'tools.download' not in conanfile_content):
-                    fixed_sources = False
+                fixed_sources = "sources" in index.subscripts.get("self.conan_data", ()) or \
+                                bool(index.calls_to("tools.get", "tools.download"))
 
             if not fixed_sources:
                 out.error("Use 'tools.get(**self.conan_data[\"sources\"][\"XXXXX\"])' "
@@ -992,13 +1541,14 @@ def pre_source(output, conanfile, conanfile_path, **kwargs):
 
 @raise_if_error_output
 def post_source(output, conanfile, conanfile_path, **kwargs):
+    source_tree = PackageTree(conanfile.source_folder)
 
     def _is_pure_c():
         if not _is_recipe_header_only(conanfile):
             cpp_extensions = ["cc", "c++", "cpp", "cxx", "c++m", "cppm", "cxxm", "h++", "hh", "hxx", "hpp"]
             c_extensions = ["c", "h"]
-            return not _get_files_with_extensions(conanfile.source_folder, cpp_extensions) and \
-                       _get_files_with_extensions(conanfile.source_folder, c_extensions)
+            return not source_tree.files_with_extensions(cpp_extensions) and \
+                       source_tree.files_with_extensions(c_extensions)
 
     @run_test("KB-H011", output)
     def test(out):
@@ -1006,15 +1556,9 @@ def post_source(output, conanfile, conanfile_path, **kwargs):
             return
 
         if _is_pure_c():
-            conanfile_content = tools.load(conanfile_path)
-            low = conanfile_content.lower()
-
+            index = recipe_sources.get(conanfile_path).index
             if conanfile.settings.get_safe("compiler") and \
-                ("del self.settings.compiler.libcxx" not in low and \
-                 'self.settings.rm_safe("compiler.libcxx")' not in low and \
-                 "self.settings.rm_safe('compiler.libcxx')" not in low and \
-                 'self.settings.compiler.rm_safe("libcxx")' not in low and \
-                 "self.settings.compiler.rm_safe('libcxx')"):
+               not index.removes_setting("compiler.libcxx"):
                 out.error("Can't detect C++ source files but recipe does not remove "
                           "'self.settings.compiler.libcxx'")
 
@@ -1024,20 +1568,15 @@ def post_source(output, conanfile, conanfile_path, **kwargs):
             return
 
         if _is_pure_c():
-            conanfile_content = tools.load(conanfile_path)
-            low = conanfile_content.lower()
+            index = recipe_sources.get(conanfile_path).index
             if conanfile.settings.get_safe("compiler") and \
-                ("del self.settings.compiler.cppstd" not in low and \
-                 'self.settings.rm_safe("compiler.cppstd")' not in low and \
-                 "self.settings.rm_safe('compiler.cppstd')" not in low and \
-                 'self.settings.compiler.rm_safe("libcxx")' not in low and \
-                 "self.settings.compiler.rm_safe('libcxx')"):
+               not index.removes_setting("compiler.cppstd"):
                 out.error("Can't detect C++ source files but recipe does not remove "
                           "'self.settings.compiler.cppstd'")
 
     @run_test("KB-H066", output)
     def test(out):
-        _check_short_paths(conanfile_path, conanfile.source_folder, 120, out)
+        _check_short_paths(conanfile_path, source_tree, 120, out)
 
 
 @raise_if_error_output
@@ -1066,18 +1605,17 @@ def pre_build(output, conanfile, **kwargs):
 @raise_if_error_output
 def post_package(output, conanfile, conanfile_path, **kwargs):
     this.reference = str(conanfile)
+    package_tree = this.package_tree = PackageTree(conanfile.package_folder)
+
     @run_test("KB-H012", output)
     def test(out):
         if conanfile.version == "system":
             return
         licenses_folder = os.path.join(os.path.join(conanfile.package_folder, "licenses"))
-        if not os.path.exists(licenses_folder):
+        if "licenses" not in package_tree.listdir():
             out.error("No 'licenses' folder found in package: %s " % conanfile.package_folder)
             return
-        licenses = []
-        for root, dirnames, filenames in os.walk(licenses_folder):
-            for filename in filenames:
-                licenses.append(filename)
+        licenses = [f.name for f in package_tree.files if f.path.startswith("./licenses/")]
         if not licenses:
             out.error("Not known valid licenses files "
                       "found at: %s\n"
@@ -1095,8 +1633,8 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
             'icu': base_known_folders + ['config', ]
         }.get(conanfile.name, base_known_folders)
 
-        for filename in os.listdir(conanfile.package_folder):
-            if os.path.isdir(os.path.join(conanfile.package_folder, filename)):
+        for filename in package_tree.listdir():
+            if package_tree.isdir(os.path.join(conanfile.package_folder, filename)):
                 if filename not in known_folders:
                     out.error("Unknown folder '{}' in the package".format(filename))
             else:
@@ -1136,7 +1674,7 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
             "battery-embed",
         ]:
             return
-        if not _files_match_settings(conanfile, conanfile.package_folder, out):
+        if not _files_match_settings(conanfile, package_tree, out):
             out.error("Packaged artifacts does not match the settings used: os=%s, compiler=%s"
                       % (_get_os(conanfile), conanfile.settings.get_safe("compiler")))
 
@@ -1144,21 +1682,21 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
     def test(out):
         if conanfile.name in ["mbits-args"]:
             return
-        if not _shared_files_well_managed(conanfile, conanfile.package_folder):
+        if not _shared_files_well_managed(conanfile, package_tree):
             out.error("Package with 'shared=True' option did not contain any shared artifact")
 
     @run_test("KB-H074", output)
     def test(out):
         if conanfile.name in ["mbits-args"]:
             return
-        if not _static_files_well_managed(conanfile, conanfile.package_folder):
+        if not _static_files_well_managed(conanfile, package_tree):
             out.error("Package with 'shared=False' option did not contain any static artifact")
 
     @run_test("KB-H076", output)
     def test(out):
         if conanfile.name in ["gcc"]:
             return
-        libs_both_static_shared = _get_libs_if_static_and_shared(conanfile)
+        libs_both_static_shared = _get_libs_if_static_and_shared(conanfile, package_tree)
         if len(libs_both_static_shared):
             out.error("Package contains both shared and static flavors of these "
                       f"libraries: {', '.join(libs_both_static_shared)}")
@@ -1167,7 +1705,7 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
     def test(out):
         if conanfile.name in ["cmake", "msys2", "strawberryperl", "android-ndk", "emsdk"]:
             return
-        bad_files = _get_files_following_patterns(conanfile.package_folder, ["*.pc"])
+        bad_files = package_tree.files_following_patterns(["*.pc"])
         if bad_files:
             out.error("The conan-center repository doesn't allow the packages to contain `pc` "
                       "files. The packages have to "
@@ -1179,9 +1717,9 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
         if conanfile.name in ["cmake", "msys2", "strawberryperl", "pybind11", "ignition-cmake",
                               "extra-cmake-modules", "emsdk", "gettext"]:
             return
-        bad_files = _get_files_following_patterns(conanfile.package_folder, ["Find*.cmake",
-                                                                             "*Config.cmake",
-                                                                             "*-config.cmake"])
+        bad_files = package_tree.files_following_patterns(["Find*.cmake",
+                                                           "*Config.cmake",
+                                                           "*-config.cmake"])
         if bad_files:
             out.error("The conan-center repository doesn't allow the packages to contain CMake "
                       "find modules or config files. The packages have to "
@@ -1191,14 +1729,14 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
 
     @run_test("KB-H017", output)
     def test(out):
-        bad_files = _get_files_following_patterns(conanfile.package_folder, ["*.pdb"])
+        bad_files = package_tree.files_following_patterns(["*.pdb"])
         if bad_files:
             out.error("The conan-center repository doesn't allow PDB files")
             out.error("Found files: {}".format("; ".join(bad_files)))
 
     @run_test("KB-H018", output)
     def test(out):
-        bad_files = _get_files_following_patterns(conanfile.package_folder, ["*.la"])
+        bad_files = package_tree.files_following_patterns(["*.la"])
         if bad_files:
             out.error("Libtool files found (*.la). Do not package *.la files "
                       "but library files (.a) ")
@@ -1208,19 +1746,19 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
     def test(out):
         if conanfile.name in ["powershell", "android-ndk", "emsdk"]:
             return
-        bad_files = _get_files_following_patterns(conanfile.package_folder,
-                                                  ["msvcr*.dll", "msvcp*.dll", "vcruntime*.dll", "concrt*.dll"])
+        bad_files = package_tree.files_following_patterns(["msvcr*.dll", "msvcp*.dll",
+                                                           "vcruntime*.dll", "concrt*.dll"])
         if bad_files:
             out.error("The conan-center repository doesn't allow Microsoft Visual Studio runtime files.")
             out.error("Found files: {}".format("; ".join(bad_files)))
 
     @run_test("KB-H066", output)
     def test(out):
-        _check_short_paths(conanfile_path, conanfile.package_folder, 160, out)
+        _check_short_paths(conanfile_path, package_tree, 160, out)
 
     @run_test("KB-H043", output)
     def test(out):
-        dict_deplibs_libs = _deplibs_from_shlibs(conanfile, out)
+        dict_deplibs_libs = _deplibs_from_shlibs(conanfile, package_tree, out)
         all_system_libs = _all_system_libs(_get_os(conanfile))
 
         needed_system_libs = set(dict_deplibs_libs.keys()).intersection(all_system_libs)
@@ -1230,7 +1768,7 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
         else:
             deps_system_libs = set(conanfile.deps_cpp_info.system_libs)
 
-        conanfile_system_libs = set(m.group(2) for m in re.finditer(r"""(["'])([a-zA-Z0-9._-]+)(\1)""", tools.load(conanfile_path))).intersection(all_system_libs)
+        conanfile_system_libs = set(m.group(2) for m in re.finditer(r"""(["'])([a-zA-Z0-9._-]+)(\1)""", recipe_sources.get(conanfile_path).content)).intersection(all_system_libs)
 
         missing_system_libs = needed_system_libs.difference(deps_system_libs.union(conanfile_system_libs))
 
@@ -1244,7 +1782,7 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
     def test(out):
         if not is_apple_os(conanfile):
             return
-        not_relocatable_libs = _get_non_relocatable_shared_libs(conanfile)
+        not_relocatable_libs = _get_non_relocatable_shared_libs(conanfile, package_tree)
         if not_relocatable_libs:
             out.warn(f"install_name dir of these shared libs is not @rpath: {', '.join(not_relocatable_libs)}")
 
@@ -1253,12 +1791,13 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
 def post_package_info(output, conanfile, reference, **kwargs):
     if not hasattr(this, "reference") or str(reference) != this.reference:
         return
+    package_tree = _get_package_tree(conanfile.package_folder)
 
     @run_test("KB-H019", output)
     def test(out):
         if conanfile.name in ["android-ndk", "cmake", "msys2", "strawberryperl"]:
             return
-        bad_files = _get_files_following_patterns(conanfile.package_folder, ["*.cmake"])
+        bad_files = package_tree.files_following_patterns(["*.cmake"])
         build_dirs = {bd.replace("\\", "/") for bd in conanfile.cpp_info.build_paths}
         for component in conanfile.cpp_info.components.values():
             build_dirs.update({bd.replace("\\", "/") for bd in component.build_paths})
@@ -1305,7 +1844,7 @@ def post_package_info(output, conanfile, reference, **kwargs):
         def _test_component(component):
             libs_to_search = list(component.libs)
             for p in component.libdirs:
-                if not os.path.isdir(p):
+                if not package_tree.isdir(p):
                     continue
                 libs_found = collect_libs(conanfile, p)
                 if conanfile.settings.get_safe("os") == "Windows" and \
@@ -1328,7 +1867,7 @@ def post_package_info(output, conanfile, reference, **kwargs):
     def test(out):
         def _test_component(component):
             for d in component.includedirs:
-                if not os.path.isdir(d):
+                if not package_tree.isdir(d):
                     out.error(f"Component {conanfile.name}::{component.name} include dir '{d}' is listed in the recipe, "
                                "but not found in package folder. The include dir should probably be fixed or removed.")
         if not conanfile.cpp_info.components:
@@ -1337,33 +1876,106 @@ def post_package_info(output, conanfile, reference, **kwargs):
             _test_component(conanfile.cpp_info.components[c])
 
 
-def _get_files_following_patterns(folder, patterns):
-    ret = []
-    with tools.chdir(folder):
-        for (root, _, filenames) in os.walk("."):
-            for filename in filenames:
-                for pattern in patterns:
-                    if fnmatch.fnmatch(filename, pattern):
-                        ret.append(os.path.join(root, filename).replace("\\", "/"))
-    return sorted(ret)
+PackageFile = collections.namedtuple("PackageFile", ("path", "name", "size", "is_link"))
+
+
+class PackageTree(object):
+    """ Index of the files below a folder, built with a single walk. Paths are stored
+        relative to the folder using the './dir/file' notation with forward slashes, and
+        the checks query the index instead of walking the filesystem again.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.files = []
+        self._walk = []
+        self._children = {}
+        self._dirs = {"."}
+        self._scan(folder, ".")
+
+    def _scan(self, path, root):
+        filenames = []
+        dirnames = []
+        children = self._children.setdefault(root, [])
+        with os.scandir(path) as entries:
+            entries = list(entries)
+            _record_io(files=len(entries))
+            for entry in entries:
+                relative = "{}/{}".format(root, entry.name)
+                children.append(entry.name)
+                # Same criteria as os.walk(): symlinks to folders are listed but not followed
+                if entry.is_dir():
+                    self._dirs.add(relative)
+                    if not entry.is_symlink():
+                        dirnames.append(entry)
+                else:
+                    stat = entry.stat(follow_symlinks=False)
+                    self.files.append(PackageFile(relative, entry.name, stat.st_size,
+                                                  entry.is_symlink()))
+                    filenames.append(entry.name)
+        self._walk.append((root, filenames))
+        for entry in dirnames:
+            self._scan(entry.path, "{}/{}".format(root, entry.name))
+
+    def _relative(self, path):
+        try:
+            relative = os.path.relpath(path, self.folder).replace("\\", "/")
+        except ValueError:  # Different drives in Windows
+            return None
+        if relative == ".":
+            return relative
+        if relative == ".." or relative.startswith("../"):
+            return None
+        return "./{}".format(relative)
+
+    def walk(self):
+        """ Same as os.walk(".") from the indexed folder, but only (root, filenames) """
+        return iter(self._walk)
+
+    def isdir(self, path):
+        relative = self._relative(path)
+        if relative is None:
+            return os.path.isdir(path)
+        return relative in self._dirs
+
+    def listdir(self, path="."):
+        relative = self._relative(os.path.join(self.folder, path))
+        return list(self._children.get(relative, []))
+
+    def files_in(self, path, pattern="*"):
+        """ Files directly inside 'path' (not recursive) whose name matches 'pattern' """
+        relative = self._relative(os.path.join(self.folder, path))
+        prefix = "{}/".format(relative)
+        return [f.path for f in self.files
+                if f.path.startswith(prefix) and "/" not in f.path[len(prefix):]
+                and fnmatch.fnmatch(f.name, pattern)]
+
+    def files_following_patterns(self, patterns):
+        return sorted(f.path for f in self.files
+                      if any(fnmatch.fnmatch(f.name, pattern) for pattern in patterns))
+
+    def files_with_extensions(self, extensions):
+        suffixes = tuple(".%s" % ext for ext in extensions if ext != "")
+        # The "" extension is used to look for possible executables
+        executables = "" in extensions
+        return [f.path for f in self.files
+                if (suffixes and f.name.endswith(suffixes)) or
+                (executables and "." not in f.name and "license" not in f.name.lower())]
+
+
+def _get_package_tree(folder):
+    # The index built in post_package() is reused by post_package_info() for the same package
+    package_tree = getattr(this, "package_tree", None)
+    if package_tree is None or package_tree.folder != folder:
+        package_tree = this.package_tree = PackageTree(folder)
+    return package_tree
 
 
-def _get_files_with_extensions(folder, extensions):
-    files = []
-    with tools.chdir(folder):
-        for (root, _, filenames) in os.walk("."):
-            for filename in filenames:
-                for ext in [ext for ext in extensions if ext != ""]:
-                    if filename.endswith(".%s" % ext):
-                        files.append(os.path.join(root, filename))
-                    # Look for possible executables
-                    elif ("" in extensions and "." not in filename
-                          and not filename.endswith(".") and "license" not in filename.lower()):
-                        files.append(os.path.join(root, filename))
-    return files
+def _get_files_following_patterns(folder, patterns):
+    return PackageTree(folder).files_following_patterns(patterns)
 
 
-def _shared_files_well_managed(conanfile, folder):
+def _shared_files_well_managed(conanfile, package_tree):
     shared_extensions = ["dll", "so", "dylib"]
     shared_name = "shared"
     try:
@@ -1371,12 +1983,12 @@ def _shared_files_well_managed(conanfile, folder):
     except Exception:
         options_dict = {key: value for key, value in conanfile.options.items()}
     if shared_name in options_dict.keys() and options_dict[shared_name] == "True":
-        if not _get_files_with_extensions(folder, shared_extensions):
+        if not package_tree.files_with_extensions(shared_extensions):
             return False
     return True
 
 
-def _static_files_well_managed(conanfile, folder):
+def _static_files_well_managed(conanfile, package_tree):
     static_extensions = ["a", "lib"]
     shared_name = "shared"
     try:
@@ -1384,12 +1996,12 @@ def _static_files_well_managed(conanfile, folder):
     except Exception:
         options_dict = {key: value for key, value in conanfile.options.items()}
     if shared_name in options_dict.keys() and options_dict[shared_name] == "False":
-        if not _get_files_with_extensions(folder, static_extensions):
+        if not package_tree.files_with_extensions(static_extensions):
             return False
     return True
 
 
-def _get_libs_if_static_and_shared(conanfile):
+def _get_libs_if_static_and_shared(conanfile, package_tree):
     # TODO: to improve. We only check whether we can find the same lib name with a static or
     # shared extension. Therefore:
     #   - it can't check anything useful for cl like compilers (Visual Studio, clang-cl, Intel-cc) for the moment
@@ -1401,26 +2013,25 @@ def _get_libs_if_static_and_shared(conanfile):
     static_libs = set()
     shared_libs = set()
 
-    libdirs = [os.path.join(conanfile.package_folder, libdir)
-               for libdir in getattr(conanfile.cpp.package, "libdirs")]
+    libdirs = getattr(conanfile.cpp.package, "libdirs")
     for libdir in libdirs:
         # Collect statib libs.
         # Pay attention to not pick up import libs while collecting static libs !
         static_libs.update([re.sub(fr"\.{static_extension}$", "", os.path.basename(p))
-                            for p in glob.glob(os.path.join(libdir, f"*.{static_extension}"))
+                            for p in package_tree.files_in(libdir, f"*.{static_extension}")
                             if not p.endswith(f".{import_lib_extension}")])
 
         # Collect shared libs and import libs
         for ext in shared_extensions + [import_lib_extension]:
             shared_libs.update([re.sub(fr"\.{ext}$", "", os.path.basename(p))
-                                for p in glob.glob(os.path.join(libdir, f"*.{ext}"))])
+                                for p in package_tree.files_in(libdir, f"*.{ext}")])
 
     result = list(static_libs.intersection(shared_libs))
     result.sort()
     return result
 
 
-def _files_match_settings(conanfile, folder, output):
+def _files_match_settings(conanfile, package_tree, output):
     header_extensions = ["h", "h++", "hh", "hxx", "hpp", "cuh"]
     visual_extensions = ["lib", "dll", "exe", "bat"]
     mingw_extensions = ["a", "lib", "a.dll", "dll", "exe", "sh"]
@@ -1429,12 +2040,12 @@ def _files_match_settings(conanfile, folder, output):
     freebsd_extensions = ["a", "so", "sh", ""]
     macos_extensions = ["a", "dylib", ""]
 
-    has_header = _get_files_with_extensions(folder, header_extensions)
-    has_visual = _get_files_with_extensions(folder, visual_extensions)
-    has_mingw = _get_files_with_extensions(folder, mingw_extensions)
-    has_linux = _get_files_with_extensions(folder, linux_extensions)
-    has_freebsd = _get_files_with_extensions(folder, freebsd_extensions)
-    has_macos = _get_files_with_extensions(folder, macos_extensions)
+    has_header = package_tree.files_with_extensions(header_extensions)
+    has_visual = package_tree.files_with_extensions(visual_extensions)
+    has_mingw = package_tree.files_with_extensions(mingw_extensions)
+    has_linux = package_tree.files_with_extensions(linux_extensions)
+    has_freebsd = package_tree.files_with_extensions(freebsd_extensions)
+    has_macos = package_tree.files_with_extensions(macos_extensions)
     settings_os = _get_os(conanfile)
 
     if not has_header and not has_visual and not has_mingw and not has_linux and not has_freebsd and not has_macos:
@@ -1513,21 +2124,19 @@ def _skip_test_package(root, filename):
     filename = os.path.relpath(root, filename).replace("\\", "/")
     return filename.startswith("test_package/build") or filename.startswith("test_package/test_output")
 
-def _check_short_paths(conanfile_path, folder_path, max_length_path, output):
-    conanfile_content = tools.load(conanfile_path)
-    if not re.search(r"(\s{4}|\t)short_paths\s*=", conanfile_content):
+def _check_short_paths(conanfile_path, tree, max_length_path, output):
+    if "short_paths" not in recipe_sources.get(conanfile_path).index.class_attributes:
         windows_max_path = 256
         # INFO: Need to reserve around 160 characters for package folder path
         file_max_length_path = windows_max_path - max_length_path
-        with tools.chdir(folder_path):
-            for (root, _, filenames) in os.walk("."):
-                for filename in filenames:
-                    filepath = os.path.join(root, filename).replace("\\", "/")
-                    if len(filepath) >= file_max_length_path:
-                        output.warn(
-                            f"The file '{filepath}' has a very long path and may exceed Windows max path length. "
-                            "Add 'short_paths = True' in your recipe.")
-                        break
+        for (root, filenames) in tree.walk():
+            for filename in filenames:
+                filepath = "{}/{}".format(root, filename)
+                if len(filepath) >= file_max_length_path:
+                    output.warn(
+                        f"The file '{filepath}' has a very long path and may exceed Windows max path length. "
+                        "Add 'short_paths = True' in your recipe.")
+                    break
 
 def _get_compiler(conanfile):
     settings = _get_settings(conanfile)
@@ -1545,22 +2154,49 @@ def _all_system_libs(os_):
         return _OSX_LIBS
 
 
-def _deplibs_from_shlibs(conanfile, out):
+def _deplibs_from_shlibs(conanfile, package_tree, out):
     deplibs = dict()
     os_ = _get_os(conanfile)
     shlext = {
         "Windows": "dll",
         "Macos": "dylib"
     }.get(os_, "so")
-    libraries = _get_files_with_extensions(conanfile.package_folder, [shlext])
+    libraries = package_tree.files_with_extensions([shlext])
     if not libraries:
         return deplibs
+
+    def _add_deplibs(library, dep_libs_fn):
+        for dep_lib_fn in dep_libs_fn:
+            if os_ == "Windows":
+                dep_lib_match = re.match(r"(.*)\.dll$", dep_lib_fn, re.IGNORECASE)
+                dep_lib_base = dep_lib_match.group(1).lower() if dep_lib_match else None
+            elif os_ == "Macos":
+                dep_lib_match = re.match(r"/System/Library/Frameworks/(.*)\.framework/Versions/(.*)/(.*)",
+                                         dep_lib_fn)
+                dep_lib_base = dep_lib_match.group(1) if dep_lib_match else None
+            else:
+                dep_lib_match = re.match(r"lib(.*).{}(?:\.[0-9]+)*".format(shlext), dep_lib_fn)
+                dep_lib_base = dep_lib_match.group(1) if dep_lib_match else None
+            if dep_lib_base:
+                deplibs.setdefault(dep_lib_base, []).append(library)
+
+    unknown_libraries = []
+    for library in libraries:
+        binary = _read_binary_deps(os.path.join(conanfile.package_folder, library))
+        if binary is None:
+            unknown_libraries.append(library)
+        else:
+            _add_deplibs(library, binary.needed)
+    if not unknown_libraries:
+        return deplibs
+
+    # Use the toolchain for the files that cannot be read natively
     if os_ == "Linux" or tools.is_apple_os(os_) or _get_compiler(conanfile) not in ["Visual Studio", "msvc"]:
         objdump = tools.get_env("OBJDUMP") or tools.which("objdump")
         if not objdump:
             out.warn("objdump not found")
             return deplibs
-        for library in libraries:
+        for library in unknown_libraries:
             if _get_os(conanfile) == "Windows":
                 cmd = [objdump, "--section=.idata", "-x", library]
             else:
@@ -1571,9 +2207,7 @@ def _deplibs_from_shlibs(conanfile, out):
                 out.warn("Running objdump on '{}' failed. Is the environment variable OBJDUMP correctly configured?".format(library))
                 continue
             if _get_os(conanfile) == "Windows":
-                for dep_lib_match in re.finditer(r"DLL Name: (.*).dll", objdump_output, re.IGNORECASE):
-                    dep_lib_base = dep_lib_match.group(1).lower()
-                    deplibs.setdefault(dep_lib_base, []).append(library)
+                dep_libs_fn = re.findall(r"DLL Name: (.*\.dll)", objdump_output, re.IGNORECASE)
             elif _get_os(conanfile) == "Macos":
                 load_commands = {}
                 number = None
@@ -1588,25 +2222,15 @@ def _deplibs_from_shlibs(conanfile, out):
                         tokens = line.split(None, 1)
                         if len(tokens) == 2:
                             load_commands[number][tokens[0]] = tokens[1]
-                r = r"/System/Library/Frameworks/(.*)\.framework/Versions/(.*)/(.*) \(offset (.*)\)"
-                r = re.compile(r)
-                for load_command in load_commands.values():
-                    if load_command.get("cmd") == "LC_LOAD_DYLIB":
-                        name = load_command.get("name", '')
-                        match = re.match(r, name)
-                        if not match:
-                            continue
-                        deplibs.setdefault(match.group(1), []).append(library)
+                dep_libs_fn = [re.sub(r" \(offset .*\)$", "", load_command.get("name", ""))
+                               for load_command in load_commands.values()
+                               if load_command.get("cmd") == "LC_LOAD_DYLIB"]
             else:
                 dep_libs_fn = list(l.replace("NEEDED", "").strip() for l in objdump_output.splitlines() if "NEEDED" in l)
-                for dep_lib_fn in dep_libs_fn:
-                    dep_lib_match = re.match(r"lib(.*).{}(?:\.[0-9]+)*".format(shlext), dep_lib_fn)
-                    if not dep_lib_match:
-                        continue
-                    deplibs.setdefault(dep_lib_match.group(1), []).append(library)
+            _add_deplibs(library, dep_libs_fn)
     elif _get_compiler(conanfile) in ["Visual Studio", "msvc"] or _get_os == "Windows":
         with tools.vcvars(conanfile):
-            for library in libraries:
+            for library in unknown_libraries:
                 try:
                     dumpbin_output = subprocess.check_output(["dumpbin", "-dependents", library], cwd=conanfile.package_folder).decode()
                 except subprocess.CalledProcessError:
@@ -1618,18 +2242,21 @@ def _deplibs_from_shlibs(conanfile, out):
     return deplibs
 
 
-def _get_non_relocatable_shared_libs(conanfile):
-    if platform.system() != "Darwin":
-        return None
-
+def _get_non_relocatable_shared_libs(conanfile, package_tree):
     bad_shared_libs = []
 
-    libdirs = [os.path.join(conanfile.package_folder, libdir)
-               for libdir in getattr(conanfile.cpp.package, "libdirs")]
+    libdirs = getattr(conanfile.cpp.package, "libdirs")
     for libdir in libdirs:
-        for dylib_path in glob.glob(os.path.join(libdir, "*.dylib")):
-            command = f"otool -D {dylib_path}"
-            install_name = check_output_runner(command).strip().split(":")[1].strip()
+        for dylib in package_tree.files_in(libdir, "*.dylib"):
+            dylib_path = os.path.join(conanfile.package_folder, dylib)
+            binary = _read_binary_deps(dylib_path)
+            if binary is not None:
+                install_name = binary.install_name or ""
+            elif platform.system() == "Darwin":
+                command = f"otool -D {dylib_path}"
+                install_name = check_output_runner(command).strip().split(":")[1].strip()
+            else:
+                continue
             install_name_dir = os.path.dirname(install_name)
             if install_name_dir != "@rpath":
                 bad_shared_libs.append(os.path.basename(dylib_path))
@@ -1637,6 +2264,178 @@ def _get_non_relocatable_shared_libs(conanfile):
     return bad_shared_libs
 
 
+BinaryDeps = collections.namedtuple("BinaryDeps", ("format", "needed", "install_name"))
+
+
+def _read_binary_deps(path):
+    """ Shared libraries a binary depends on and its own install name (ELF DT_SONAME, Mach-O
+        LC_ID_DYLIB), read from the headers of ELF, PE and Mach-O (also universal) files without
+        running any tool. Only the pages with the headers are read, as the file is memory
+        mapped. None if the format is not supported.
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < 64:
+                return None
+            with contextlib.closing(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) as data:
+                magic = data[:4]
+                if magic == b"\x7fELF":
+                    return _read_elf_deps(data)
+                if magic[:2] == b"MZ":
+                    return _read_pe_deps(data)
+                if magic in _MACHO_MAGICS or magic in _MACHO_FAT_MAGICS:
+                    return _read_macho_deps(data)
+    except (EnvironmentError, ValueError, IndexError, struct.error):
+        pass
+    return None
+
+
+def _c_string(data, start, end=None):
+    end_string = data.find(b"\0", start, len(data) if end is None else end)
+    if end_string < 0:
+        raise ValueError("Unterminated string at offset {}".format(start))
+    return data[start:end_string].decode("utf-8", "replace")
+
+
+def _read_elf_deps(data):
+    ei_class, ei_data = data[4], data[5]
+    if ei_class not in (1, 2) or ei_data not in (1, 2):
+        return None
+    endian = "<" if ei_data == 1 else ">"
+    if ei_class == 2:
+        header, phdr, dyn = "HHIQQQIHHH", "IIQQQQQQ", "qQ"
+    else:
+        header, phdr, dyn = "HHIIIIIHHH", "IIIIIIII", "iI"
+    _, _, _, _, e_phoff, _, _, _, e_phentsize, e_phnum = struct.unpack_from(endian + header, data, 16)
+
+    loads = []
+    dynamic = None
+    for i in range(e_phnum):
+        fields = struct.unpack_from(endian + phdr, data, e_phoff + i * e_phentsize)
+        if ei_class == 2:
+            p_type, _, p_offset, p_vaddr, _, p_filesz, _, _ = fields
+        else:
+            p_type, p_offset, p_vaddr, _, p_filesz, _, _, _ = fields
+        if p_type == 1:  # PT_LOAD
+            loads.append((p_vaddr, p_offset, p_filesz))
+        elif p_type == 2:  # PT_DYNAMIC
+            dynamic = (p_offset, p_filesz)
+    if dynamic is None:  # Statically linked
+        return BinaryDeps("ELF", [], None)
+
+    entries = []
+    dyn_size = struct.calcsize(endian + dyn)
+    offset, end = dynamic[0], dynamic[0] + dynamic[1]
+    while offset + dyn_size <= end:
+        d_tag, d_val = struct.unpack_from(endian + dyn, data, offset)
+        if d_tag == 0:  # DT_NULL
+            break
+        entries.append((d_tag, d_val))
+        offset += dyn_size
+
+    # DT_STRTAB is a virtual address, translate it to an offset in the file
+    strtab_address = next((d_val for d_tag, d_val in entries if d_tag == 5), None)
+    strtab = next((offset + strtab_address - vaddr for vaddr, offset, filesz in loads
+                   if vaddr <= strtab_address < vaddr + filesz), None) \
+        if strtab_address is not None else None
+    if strtab is None:
+        return None
+
+    needed = [_c_string(data, strtab + d_val) for d_tag, d_val in entries if d_tag == 1]  # DT_NEEDED
+    soname = next((_c_string(data, strtab + d_val) for d_tag, d_val in entries if d_tag == 14),
+                  None)  # DT_SONAME
+    return BinaryDeps("ELF", needed, soname)
+
+
+def _read_pe_deps(data):
+    pe_offset = struct.unpack_from("<I", data, 0x3c)[0]
+    if data[pe_offset:pe_offset + 4] != b"PE\0\0":
+        return None
+    _, number_of_sections, _, _, _, optional_header_size, _ = struct.unpack_from("<HHIIIHH", data,
+                                                                               pe_offset + 4)
+    optional_header = pe_offset + 24
+    magic = struct.unpack_from("<H", data, optional_header)[0]
+    if magic not in (0x10b, 0x20b):  # PE32, PE32+
+        return None
+    data_directories = optional_header + (96 if magic == 0x10b else 112)
+    number_of_directories = struct.unpack_from("<I", data, data_directories - 4)[0]
+
+    sections = []
+    section_table = optional_header + optional_header_size
+    for i in range(number_of_sections):
+        # VirtualSize, VirtualAddress, SizeOfRawData, PointerToRawData
+        sections.append(struct.unpack_from("<IIII", data, section_table + i * 40 + 8))
+
+    def _offset(rva):
+        for virtual_size, virtual_address, raw_size, raw_pointer in sections:
+            if virtual_address <= rva < virtual_address + max(virtual_size, raw_size):
+                return rva - virtual_address + raw_pointer
+        raise ValueError("RVA {:#x} is not in any section".format(rva))
+
+    needed = []
+    import_rva = struct.unpack_from("<I", data, data_directories + 8)[0] \
+        if number_of_directories > 1 else 0
+    if import_rva:
+        descriptor = _offset(import_rva)
+        while True:
+            lookup, _, _, name_rva, thunk = struct.unpack_from("<IIIII", data, descriptor)
+            if not (lookup or name_rva or thunk):
+                break
+            needed.append(_c_string(data, _offset(name_rva)))
+            descriptor += 20
+    return BinaryDeps("PE", needed, None)
+
+
+_MACHO_MAGICS = {b"\xfe\xed\xfa\xce": (">", 28), b"\xfe\xed\xfa\xcf": (">", 32),
+                 b"\xce\xfa\xed\xfe": ("<", 28), b"\xcf\xfa\xed\xfe": ("<", 32)}
+_MACHO_FAT_MAGICS = {b"\xca\xfe\xba\xbe": (">iiIII", 20), b"\xca\xfe\xba\xbf": (">iiQQII", 32)}
+# LC_LOAD_DYLIB, LC_LOAD_WEAK_DYLIB, LC_REEXPORT_DYLIB, LC_LAZY_LOAD_DYLIB, LC_LOAD_UPWARD_DYLIB
+_MACHO_LOAD_DYLIB_COMMANDS = {0xc, 0x80000018, 0x8000001f, 0x20, 0x80000023}
+_MACHO_ID_DYLIB_COMMAND = 0xd
+
+
+def _read_macho_deps(data, offset=0):
+    magic = data[offset:offset + 4]
+    if magic in _MACHO_FAT_MAGICS:
+        if offset:  # Nested universal binaries are not valid
+            return None
+        fat_arch, fat_arch_size = _MACHO_FAT_MAGICS[magic]
+        number_of_archs = struct.unpack_from(">I", data, 4)[0]
+        if number_of_archs > 64:  # Java class files share the magic
+            return None
+        needed = []
+        install_name = None
+        for i in range(number_of_archs):
+            arch_offset = struct.unpack_from(fat_arch, data, 8 + i * fat_arch_size)[2]
+            binary = _read_macho_deps(data, arch_offset)
+            if binary is None:
+                return None
+            needed.extend(name for name in binary.needed if name not in needed)
+            install_name = install_name or binary.install_name
+        return BinaryDeps("Mach-O", needed, install_name)
+
+    if magic not in _MACHO_MAGICS:
+        return None
+    endian, header_size = _MACHO_MAGICS[magic]
+    number_of_commands = struct.unpack_from(endian + "I", data, offset + 16)[0]
+    needed = []
+    install_name = None
+    command = offset + header_size
+    for _ in range(number_of_commands):
+        cmd, cmdsize = struct.unpack_from(endian + "II", data, command)
+        if cmdsize < 8:
+            return None
+        if cmd in _MACHO_LOAD_DYLIB_COMMANDS or cmd == _MACHO_ID_DYLIB_COMMAND:
+            name_offset = struct.unpack_from(endian + "I", data, command + 8)[0]
+            name = _c_string(data, command + name_offset, command + cmdsize)
+            if cmd == _MACHO_ID_DYLIB_COMMAND:
+                install_name = name
+            else:
+                needed.append(name)
+        command += cmdsize
+    return BinaryDeps("Mach-O", needed, install_name)
+
+
 _GLIBC_LIBS = {
     "anl", "BrokenLocale", "crypt", "dl", "g", "m", "mvec", "nsl", "nss_compat", "nss_db", "nss_dns",
     "nss_files", "nss_hesiod", "pthread", "resolv", "rt", "thread_db", "util",
@@ -1717,9 +2516,15 @@ _OSX_LIBS = {
     'vmnet'
 }
 
+_load_conanfile_lock = threading.Lock()
+
+
 def _load_conanfile(conanfile_path):
-    python_requires = ConanPythonRequire(None, None)
-    _, conanfile_obj = parse_conanfile(conanfile_path,
-                                       python_requires=python_requires,
-                                       generator_manager=None)
+    # Loading a conanfile modifies sys.path and sys.modules, checks running in the
+    # thread pool (CONAN_HOOK_JOBS) must not do it at the same time
+    with _load_conanfile_lock:
+        python_requires = ConanPythonRequire(None, None)
+        _, conanfile_obj = parse_conanfile(conanfile_path,
+                                           python_requires=python_requires,
+                                           generator_manager=None)
     return conanfile_obj
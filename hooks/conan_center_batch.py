@@ -0,0 +1,170 @@
+""" Runs the recipe checks of the Conan Center hook (pre_export, post_export and pre_source) over
+    many recipes without running Conan, e.g. over a whole conan-center-index checkout:
+
+        python -m hooks.conan_center_batch path/to/conan-center-index/recipes
+
+    Recipes are discovered as <path>/<name>/<folder>/conanfile.py (or <path>/conanfile.py), and
+    checked with the first version of config.yml using that folder (all of them with
+    --all-versions). Recipes are checked in a pool of processes, and the warnings and errors of
+    each one are printed as soon as it finishes. The exit code is 1 if any check failed.
+"""
+import argparse
+import collections
+import glob
+import importlib.util
+import io
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+from conans.client.graph.python_requires import ConanPythonRequire
+from conans.client.loader import ConanFileLoader
+from conans.client.output import ConanOutput, ScopedOutput
+from conans.model.ref import ConanFileReference
+
+
+HOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conan-center.py")
+HOOK_METHODS = ("pre_export", "post_export", "pre_source")
+
+RecipeResult = collections.namedtuple("RecipeResult", ("conanfile_path", "reference", "lines"))
+
+_hook = None
+
+
+def _load_hook():
+    """ conan-center.py of this folder (the module is loaded once per process) """
+    global _hook
+    if _hook is None:
+        spec = importlib.util.spec_from_file_location("conan_center", HOOK_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        # Like Conan, the modules next to the hook can be imported while it is loaded
+        sys.path.append(os.path.dirname(HOOK_PATH))
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            sys.path.pop()
+        _hook = module
+    return _hook
+
+
+def discover_recipes(paths, all_versions=False):
+    """ (conanfile_path, version) of every recipe to check. Version is None when it is not
+        listed in config.yml, then the one of the recipe is used
+    """
+    recipes = []
+    for path in paths:
+        conanfile_path = os.path.join(path, "conanfile.py")
+        if os.path.isfile(conanfile_path):
+            conanfile_paths = [conanfile_path]
+        else:
+            conanfile_paths = sorted(glob.glob(os.path.join(path, "*", "*", "conanfile.py")))
+        for conanfile_path in conanfile_paths:
+            versions = _recipe_versions(conanfile_path)
+            if not all_versions:
+                versions = versions[:1]
+            recipes.extend((os.path.abspath(conanfile_path), version) for version in versions)
+    return recipes
+
+
+def _recipe_versions(conanfile_path):
+    recipe_folder = os.path.dirname(os.path.abspath(conanfile_path))
+    config = _load_hook().load_yml(os.path.join(os.path.dirname(recipe_folder), "config.yml"))
+    versions = config.get("versions") if isinstance(config, dict) else None
+    folder = os.path.basename(recipe_folder)
+    versions = [str(version) for version, info in (versions or {}).items()
+                if isinstance(info, dict) and info.get("folder") == folder]
+    return versions or [None]
+
+
+def check_recipe(recipe):
+    """ Runs the hook methods over a recipe, like 'conan export' and 'conan source' would do.
+        post_export and pre_source work on a copy of the recipe, as KB-H031 modifies the
+        conandata.yml like it would do in the Conan cache
+    """
+    conanfile_path, version = recipe
+    hook = _load_hook()
+    stream = io.StringIO()
+    output = ConanOutput(stream, color=False)
+    name = os.path.basename(os.path.dirname(os.path.dirname(conanfile_path)))
+    try:
+        loader = ConanFileLoader(None, output, ConanPythonRequire(None, None))
+        conanfile = loader.load_export(conanfile_path, name, version, None, None)
+    except Exception as e:
+        return RecipeResult(conanfile_path, "{}/{}".format(name, version),
+                            ["ERROR: Cannot load the recipe: {}".format(e)])
+    reference = ConanFileReference(conanfile.name, str(conanfile.version), None, None)
+
+    export_folder = tempfile.mkdtemp(prefix="conan_center_batch")
+    try:
+        recipe_folder = os.path.dirname(conanfile_path)
+        for filename in ("conanfile.py", "conandata.yml"):
+            if os.path.isfile(os.path.join(recipe_folder, filename)):
+                shutil.copy2(os.path.join(recipe_folder, filename), export_folder)
+        for method in HOOK_METHODS:
+            path = conanfile_path if method == "pre_export" else \
+                os.path.join(export_folder, "conanfile.py")
+            scoped_output = ScopedOutput("[HOOK - conan-center.py] {}()".format(method), output)
+            try:
+                getattr(hook, method)(output=scoped_output, conanfile=conanfile,
+                                      conanfile_path=path, reference=reference)
+            except Exception as e:
+                scoped_output.error("Exception raised from hook: {} (type={})"
+                                    .format(e, type(e).__name__))
+    finally:
+        shutil.rmtree(export_folder, ignore_errors=True)
+    return RecipeResult(conanfile_path, str(reference), stream.getvalue().splitlines())
+
+
+def _is_error(line):
+    return "ERROR:" in line
+
+
+def _is_warning(line):
+    return "WARN:" in line
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip(),
+                                     prog="python -m hooks.conan_center_batch")
+    parser.add_argument("paths", nargs="+",
+                        help="Folders with recipes (<name>/<folder>/conanfile.py) or recipe folders")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of processes (default: number of CPUs)")
+    parser.add_argument("--all-versions", action="store_true",
+                        help="Check every version of config.yml, not only the first one of each folder")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Print the output of all the checks, not only warnings and errors")
+    args = parser.parse_args(args)
+
+    recipes = discover_recipes(args.paths, args.all_versions)
+    failed = 0
+    if args.jobs > 1 and len(recipes) > 1:
+        # Recycle the processes from time to time, as the hook caches every recipe it reads
+        pool = multiprocessing.Pool(min(args.jobs, len(recipes)), maxtasksperchild=50)
+        results = pool.imap_unordered(check_recipe, recipes)
+    else:
+        pool = None
+        results = map(check_recipe, recipes)
+    try:
+        for result in results:
+            errors = [line for line in result.lines if _is_error(line)]
+            warnings = [line for line in result.lines if _is_warning(line)]
+            failed += bool(errors)
+            print("{} ({}): {} errors, {} warnings".format(result.reference, result.conanfile_path,
+                                                          len(errors), len(warnings)))
+            for line in result.lines:
+                if args.verbose or line in errors or line in warnings:
+                    print("    {}".format(line))
+            sys.stdout.flush()
+    finally:
+        if pool:
+            pool.terminate()
+    print("{} recipes checked, {} with errors".format(len(recipes), failed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
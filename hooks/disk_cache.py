@@ -0,0 +1,94 @@
+# coding=utf-8
+
+""" On disk cache shared by the hooks that can reuse their results (conan-center, binary_linter,
+    recipe_linter and yaml_linter). It is not a hook, it has to be next to them.
+"""
+
+import json
+import os
+import tempfile
+
+
+class DiskCache(object):
+    """ JSON values by key (a hex digest), stored as <folder>/<key[:2]>/<key>.json. The folder
+        can be shared by several processes or machines: entries are written to a temporary file
+        and renamed, so readers never see partial entries. Reading an entry updates its
+        modification time, and evict() removes the least recently used entries when the folder
+        grows over 'max_size' bytes. It walks the whole folder, so call it once per run.
+    """
+
+    def __init__(self, folder, max_size):
+        self.folder = folder
+        self.max_size = max_size
+        self.written = False  # Whether any entry was written since the last eviction
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], key + ".json")
+
+    def get(self, key):
+        """ Value of the entry, None if there is no entry or it cannot be read """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)["value"]
+        except (EnvironmentError, ValueError, KeyError, TypeError):
+            return None
+        try:
+            os.utime(path, None)
+        except EnvironmentError:
+            pass
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"value": value}, f)
+            os.replace(tmp_path, path)
+            self.written = True
+        except EnvironmentError:
+            pass
+
+    def entries(self):
+        """ (modification time, size, path) of every entry """
+        entries = []
+        if not os.path.isdir(self.folder):
+            return entries
+        for folder in os.scandir(self.folder):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except EnvironmentError:  # Removed by other process
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, max_size=None):
+        max_size = self.max_size if max_size is None else max_size
+        self.written = False
+        entries = self.entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except EnvironmentError:  # Removed by other process
+                pass
+            total_size -= size
+
+
+def get_cache(folder_variable, size_variable):
+    """ Cache in the folder of the environment variable 'folder_variable', None if it is not
+        set. Its size is limited to 'size_variable' megabytes (100 by default)
+    """
+    folder = os.getenv(folder_variable)
+    if not folder:
+        return None
+    max_size = float(os.getenv(size_variable, "100")) * 1024 * 1024
+    return DiskCache(os.path.abspath(folder), max_size)
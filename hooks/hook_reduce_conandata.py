@@ -3,11 +3,18 @@ import yaml
 
 from conan.tools.files import load, save
 
+try:
+    from yaml_documents import dump_yml, load_yml as _load_yml
+except ImportError:  # Installed without yaml_documents.py, documents are parsed every time
+    def _load_yml(path, load):
+        return yaml.safe_load(load(path)) if os.path.isfile(path) else None
+
+    def dump_yml(data):
+        return yaml.safe_dump(data, default_flow_style=False)
+
 
 def load_yml(conanfile, path):
-    if os.path.isfile(path):
-        return yaml.safe_load(load(conanfile, path))
-    return None
+    return _load_yml(path, lambda path: load(conanfile, path))
 
 
 def post_export(conanfile):
@@ -24,6 +31,6 @@ def post_export(conanfile):
         info[entry] = {}
         info[entry][version] = conandata_yml[entry][version]
     conanfile.output.info("Saving conandata.yml: {}".format(info))
-    new_conandata_yml = yaml.safe_dump(info, default_flow_style=False)
+    new_conandata_yml = dump_yml(info)
     conanfile.output.info("New conandata.yml contents: {}".format(new_conandata_yml))
     save(conanfile, conandata_path, new_conandata_yml)
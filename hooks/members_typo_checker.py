@@ -4,14 +4,50 @@ from difflib import get_close_matches
 from conans import ConanFile
 
 
-def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
-    def get_base_members(conanfile):
-        return [m[0] for m in inspect.getmembers(conanfile) if not m[0].startswith('_')]
+_EXTRA_MEMBERS = ["requires", "build_requires", "requirements",
+                  "build_requirements", "python_requires", "python_requires_extend",
+                  "keep_imports", "imports", "build_id", "deploy", "scm"]
+_MAX_MATCHES = 5
+_CUTOFF = 0.80
+
+_base_members = None
+_members_by_length = None
+# Matches of the members already checked by this process
+_matches = {}
+
+
+def _get_base_members():
+    """ Members of ConanFile and the ones a recipe can declare, computed once per process and
+        indexed by their length
+    """
+    global _base_members, _members_by_length
+    if _base_members is None:
+        base_members = set(m[0] for m in inspect.getmembers(ConanFile) if not m[0].startswith('_'))
+        base_members.update(_EXTRA_MEMBERS)
+        members_by_length = {}
+        for member in sorted(base_members):
+            members_by_length.setdefault(len(member), []).append(member)
+        _base_members, _members_by_length = frozenset(base_members), members_by_length
+    return _base_members
 
-    base_members = get_base_members(ConanFile)
-    base_members.extend(["requires", "build_requires", "requirements",
-                         "build_requirements", "python_requires", "python_requires_extend",
-                         "keep_imports", "imports", "build_id", "deploy", "scm"])
+
+def _close_matches(member):
+    """ Same as difflib.get_close_matches over all the base members, but only the ones whose
+        length could reach the cutoff (the 'real_quick_ratio' bound of difflib) are compared
+    """
+    if member not in _matches:
+        _get_base_members()
+        candidates = []
+        for length, members in _members_by_length.items():
+            if 2.0 * min(len(member), length) / (len(member) + length) >= _CUTOFF:
+                candidates.extend(members)
+        _matches[member] = get_close_matches(word=member, possibilities=candidates,
+                                             n=_MAX_MATCHES, cutoff=_CUTOFF)
+    return _matches[member]
+
+
+def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
+    base_members = _get_base_members()
 
     def get_members(conanfile):
         # We use a different function on the conanfile because members
@@ -22,8 +58,7 @@ def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
         if member in base_members:
             continue
 
-        matches = get_close_matches(
-            word=member, possibilities=base_members, n=5, cutoff=0.80)
+        matches = _close_matches(member)
         if len(matches) == 0:
             continue
 
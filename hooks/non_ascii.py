@@ -1,32 +1,103 @@
 # -*- coding: utf-8 -*-
 
+import codecs
 import os
+import re
 import unicodedata
-from conans import tools
 
+from conans.util.files import decode_text
 
-def check_non_ascii(filename, content, output):
+
+CONAN_HOOK_NON_ASCII_MAX_BYTES = "CONAN_NON_ASCII_MAX_BYTES"
+
+_NON_ASCII = re.compile(u"[^\x00-\x7f]")
+_NON_ASCII_BYTES = re.compile(b"[^\x00-\x7f]")
+_CHUNK_SIZE = 64 * 1024
+_WIDE_BOMS = (codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+
+def check_non_ascii(filename, content, output, level="error"):
+    if not _NON_ASCII.search(content):  # Usual case, pure ASCII
+        return
+    report = getattr(output, level)
     for num, line in enumerate(content.splitlines(), 1):
-        bad_chars = {num: char for num, char in enumerate(line, 1) if ord(char) >= 128}
-        if bad_chars:
-            output.error("The file '{}' contains a non-ascii character at line ({})."
-                        " Only ASCII characters are allowed, please remove it.".format(filename, num))
-            indexes = bad_chars.keys()
-            draw = ['^' if i in indexes else ' ' for i in range(1, len(line))]
-            draw = ''.join(draw)
-            bad_chars = bad_chars.values()
-            bad_chars = ["\\x%s (%s)" % (format(ord(c), 'x'), unicodedata.name(c)) for c in bad_chars]
-            message = "bad characters: " + ' '.join(bad_chars)
-            output.info(message)
-            output.info(line)
-            output.info(draw)
+        if not _NON_ASCII.search(line):
+            continue
+        report("The file '{}' contains a non-ascii character at line ({})."
+               " Only ASCII characters are allowed, please remove it.".format(filename, num))
+        indexes = [match.start() for match in _NON_ASCII.finditer(line)]
+        draw = ''.join('^' if i in indexes else ' ' for i in range(max(indexes) + 1))
+        bad_chars = ["\\x%s (%s)" % (format(ord(line[i]), 'x'), unicodedata.name(line[i], "?"))
+                     for i in indexes]
+        message = "bad characters: " + ' '.join(bad_chars)
+        output.info(message)
+        output.info(line)
+        output.info(draw)
+
+
+def _scan_file(path):
+    """ Reads the file in chunks. Returns the number of bytes read and the content: None for
+        binary files (with a NUL byte), the decoded content if it has any non-ascii character and
+        an empty string otherwise
+    """
+    found = False
+    read = 0
+    with open(path, "rb") as f:
+        chunk = f.read(_CHUNK_SIZE)
+        if chunk.startswith(_WIDE_BOMS):  # UTF-16 and UTF-32 text is not ASCII compatible
+            data = chunk + f.read()
+            return len(data), decode_text(data)
+        if chunk.startswith(codecs.BOM_UTF8):
+            chunk = chunk[len(codecs.BOM_UTF8):]
+            read += len(codecs.BOM_UTF8)
+        while chunk:
+            read += len(chunk)
+            if b"\0" in chunk:
+                return read, None
+            found = found or bool(_NON_ASCII_BYTES.search(chunk))
+            chunk = f.read(_CHUNK_SIZE)
+    if not found:
+        return read, ""
+    with open(path, "rb") as f:
+        return read, decode_text(f.read())
+
+
+def _check_file(path, filename, output, level="error"):
+    """ Returns the number of bytes read """
+    read, content = _scan_file(path)
+    if content:
+        check_non_ascii(filename, content, output, level)
+    return read
 
 
 def pre_export(output, conanfile, conanfile_path, reference, **kwargs):
-    conanfile_content = tools.load(conanfile_path)
-    check_non_ascii("conanfile.py", conanfile_content, output)
+    _check_file(conanfile_path, "conanfile.py", output)
     test_package_dir = os.path.join(os.path.dirname(conanfile_path), "test_package")
     test_package_path = os.path.join(test_package_dir, "conanfile.py")
     if os.path.exists(test_package_path):
-        test_package_content = tools.load(test_package_path)
-        check_non_ascii("test_package/conanfile.py", test_package_content, output)
+        _check_file(test_package_path, "test_package/conanfile.py", output)
+
+
+def post_export(output, conanfile, conanfile_path, reference, **kwargs):
+    """ Checks the other text files exported with the recipe (conandata.yml, patches, CMake
+        wrappers...), up to CONAN_NON_ASCII_MAX_BYTES bytes (10 MB by default)
+    """
+    export_folder = os.path.dirname(conanfile_path)
+    export_source_folder = os.path.join(os.path.dirname(export_folder), "export_source")
+    budget = int(os.getenv(CONAN_HOOK_NON_ASCII_MAX_BYTES, str(10 * 1024 * 1024)))
+
+    for folder in (export_folder, export_source_folder):
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, folder).replace("\\", "/")
+                if folder == export_folder and filename in ("conanfile.py", "conanmanifest.txt"):
+                    continue
+                # Only the bytes read are counted, binaries are skipped after the first chunk
+                if budget <= 0:
+                    output.warn("Stopped checking the exported files for non-ascii characters "
+                                "at '{}', the limit of {} is reached".format(
+                                    filename, CONAN_HOOK_NON_ASCII_MAX_BYTES))
+                    return
+                budget -= _check_file(path, filename, output, level="warn")
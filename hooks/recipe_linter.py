@@ -1,40 +1,95 @@
 # coding=utf-8
 
+import argparse
+import collections
+import hashlib
 import json
 import os
 import platform
 import subprocess
 import re
+import sys
 
 from conans.errors import ConanException
 from conans.tools import logger
 
+try:
+    from disk_cache import get_cache
+except ImportError:  # Installed without disk_cache.py, the messages are not cached
+    def get_cache(folder_variable, size_variable):
+        return None
+
 
 CONAN_HOOK_PYLINT_RCFILE = "CONAN_PYLINTRC"
 CONAN_HOOK_PYLINT_WERR = "CONAN_PYLINT_WERR"
 CONAN_HOOK_PYLINT_RECIPE_PLUGINS = "CONAN_PYLINT_RECIPE_PLUGINS"
+CONAN_HOOK_PYLINT_IN_PROCESS = "CONAN_PYLINT_IN_PROCESS"
+CONAN_HOOK_PYLINT_CACHE_DIR = "CONAN_PYLINT_CACHE_DIR"
+CONAN_HOOK_PYLINT_CACHE_SIZE = "CONAN_PYLINT_CACHE_SIZE"
 
 
 def pre_export(output, conanfile_path, *args, **kwargs):
     try:
         import astroid  # Conan 'pylint_plugin.py' uses astroid
-        from pylint import epylint as lint
+        import pylint
     except ImportError as e:
         output.error("Install pylint to use 'recipe_linter' hook: 'pip install pylint astroid'")
         return
     output.info("Lint recipe '{}'".format(conanfile_path))
-    conanfile_dirname = os.path.dirname(conanfile_path)
 
-    lint_args = ['--output-format=json',  # JSON output fails in Windows (parsing)
-                 '--enable=all',
+    # The test_package is linted in the same run
+    conanfile_paths = [conanfile_path]
+    test_package_path = os.path.join(os.path.dirname(conanfile_path), "test_package", "conanfile.py")
+    if os.path.isfile(test_package_path):
+        conanfile_paths.append(test_package_path)
+    lint_args = _lint_args(conanfile_paths)
+
+    cache = get_cache(CONAN_HOOK_PYLINT_CACHE_DIR, CONAN_HOOK_PYLINT_CACHE_SIZE)
+    cache_key = _cache_key(conanfile_paths, lint_args) if cache else None
+    messages = cache.get(cache_key) if cache_key else None
+    if messages is not None:
+        output.info("Linter messages taken from the cache")
+    else:
+        if os.getenv(CONAN_HOOK_PYLINT_IN_PROCESS):
+            try:
+                messages = _lint_in_process(conanfile_paths, lint_args)
+            except (Exception, SystemExit) as exc:
+                output.error("Unexpected error running linter: {}".format(exc))
+                return
+        else:
+            messages = _lint_subprocess(output, conanfile_paths, lint_args)
+            if messages is None:
+                return
+        if cache_key:
+            cache.put(cache_key, messages)
+            cache.evict()
+
+    errors = 0
+    for msg in messages:
+        output.info(_format_message(msg))
+        errors += int(msg["type"] == "error")
+
+    output.info("Linter detected '{}' errors".format(errors))
+    if os.getenv(CONAN_HOOK_PYLINT_WERR) and errors:
+        raise ConanException("Package recipe has linter errors. Please fix them.")
+
+
+def _format_message(msg):
+    return "{path}:{line}:{column}: {message-id}: {message} ({symbol})".format(**msg)
+
+
+def _lint_args(conanfile_paths):
+    lint_args = ['--enable=all',
                  '--reports=no',
                  '--disable=no-absolute-import',
                  '--persistent=no',
                  # These were disabled in linter that was inside Conan
                  # '--disable=W0702',  # No exception type(s) specified (bare-except)
                  # '--disable=W0703',  # Catching too general exception Exception (broad-except)
-                 '--init-hook="import sys;sys.path.extend([\'{}\',])"'.format(conanfile_dirname.replace('\\', '/'))
                  ]
+    if len(conanfile_paths) > 1:
+        # Similar lines in different recipes are fine, and it would compare all of them
+        lint_args += ['--disable=duplicate-code']
 
     pylint_plugins = os.getenv(CONAN_HOOK_PYLINT_RECIPE_PLUGINS, 'conans.pylint_plugin')
     if pylint_plugins:
@@ -43,9 +98,47 @@ def pre_export(output, conanfile_path, *args, **kwargs):
     rc_file = os.getenv(CONAN_HOOK_PYLINT_RCFILE)
     if rc_file:
         lint_args += ['--rcfile', rc_file.replace('\\', '/')]
+    return lint_args
+
 
+def _cache_key(conanfile_paths, lint_args):
+    """ Everything the messages depend on: the recipes and the Python files next to them, the
+        pylint arguments, the rcfile, pylint and astroid versions and the folder the paths in the
+        messages are relative to
+    """
+    import astroid
+    import pylint
+    sha = hashlib.sha256()
+    for value in [os.getcwd(), getattr(pylint, "__version__", ""),
+                  getattr(astroid, "__version__", "")] + lint_args + conanfile_paths:
+        sha.update(value.encode("utf-8") + b"\0")
+    files = set()
+    for path in conanfile_paths:
+        folder = os.path.dirname(os.path.abspath(path))
+        files.update(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".py"))
+    rc_file = os.getenv(CONAN_HOOK_PYLINT_RCFILE)
+    if rc_file:
+        files.add(rc_file)
+    for path in sorted(files):
+        sha.update(path.encode("utf-8") + b"\0")
+        try:
+            with open(path, "rb") as f:
+                sha.update(f.read())
+        except EnvironmentError:
+            pass
+    return sha.hexdigest()
+
+
+def _lint_subprocess(output, conanfile_paths, lint_args):
+    """ Runs the pylint executable, returns the messages or None if it failed """
+    conanfile_dirnames = ",".join("\'{}\'".format(os.path.dirname(path).replace('\\', '/'))
+                                  for path in conanfile_paths)
+    lint_args = ['--output-format=json',  # JSON output fails in Windows (parsing)
+                 '--init-hook="import sys;sys.path.extend([{},])"'.format(conanfile_dirnames)
+                 ] + lint_args
     try:
-        command = ['pylint'] + lint_args + ['"{}"'.format(conanfile_path).replace('\\', '/')]
+        command = ['pylint'] + lint_args + ['"{}"'.format(path).replace('\\', '/')
+                                            for path in conanfile_paths]
         command = " ".join(command)
         shell = bool(platform.system() != "Windows")
         p = subprocess.Popen(command, shell=shell, bufsize=10,
@@ -57,23 +150,93 @@ def pre_export(output, conanfile_path, *args, **kwargs):
         pylint_stdout = ansi_escape.sub('', pylint_stdout.decode('utf-8'))
     except Exception as exc:
         output.error("Unexpected error running linter: {}".format(exc))
-    else:
+        return None
+
+    try:
+        return json.loads(pylint_stdout)
+    except Exception as exc:
+        output.error("Error parsing JSON output: {}".format(exc))
+        logger.error(
+            "Error parsing linter output for recipe '{}': {}".format(conanfile_paths[0], exc))
+        logger.error(" - linter arguments: {}".format(lint_args))
+        logger.error(" - output: {}".format(pylint_stdout))
+        logger.error(" - stderr: {}".format(pylint_stderr))
+        return None
+
+
+def _lint_in_process(conanfile_paths, lint_args):
+    """ Runs pylint in this process and collects its messages. The plugins and the modules
+        parsed by astroid (Conan, the standard library...) are kept for the next recipes
+        linted by this process, only the first one pays for loading them
+    """
+    from astroid import MANAGER
+    from pylint.lint import Run
+    from pylint.reporters import CollectingReporter
+
+    conanfile_dirnames = [os.path.abspath(os.path.dirname(path)) for path in conanfile_paths]
+    reporter = CollectingReporter()
+    sys.path.extend(conanfile_dirnames)
+    try:
         try:
-            messages = json.loads(pylint_stdout)
-        except Exception as exc:
-            output.error("Error parsing JSON output: {}".format(exc))
-            logger.error(
-                "Error parsing linter output for recipe '{}': {}".format(conanfile_path, exc))
-            logger.error(" - linter arguments: {}".format(lint_args))
-            logger.error(" - output: {}".format(pylint_stdout))
-            logger.error(" - stderr: {}".format(pylint_stderr))
-        else:
-            errors = 0
-            for msg in messages:
-                line = "{path}:{line}:{column}: {message-id}: {message} ({symbol})".format(**msg)
-                output.info(line)
-                errors += int(msg["type"] == "error")
-
-            output.info("Linter detected '{}' errors".format(errors))
-            if os.getenv(CONAN_HOOK_PYLINT_WERR) and errors:
-                raise ConanException("Package recipe has linter errors. Please fix them.")
+            Run(lint_args + list(conanfile_paths), reporter=reporter, exit=False)
+        except TypeError:  # pylint < 2.5
+            Run(lint_args + list(conanfile_paths), reporter=reporter, do_exit=False)
+    finally:
+        for dirname in conanfile_dirnames:
+            sys.path.remove(dirname)
+        # The recipes and the modules next to them can change before they are linted again
+        for name, module in list(MANAGER.astroid_cache.items()):
+            if module.file and os.path.dirname(os.path.abspath(module.file)) in conanfile_dirnames:
+                del MANAGER.astroid_cache[name]
+
+    return [{"path": msg.path, "abspath": msg.abspath, "line": msg.line, "column": msg.column,
+             "message-id": msg.msg_id, "message": msg.msg, "symbol": msg.symbol,
+             "type": msg.category}
+            for msg in reporter.messages]
+
+
+def lint_recipes(conanfile_paths, jobs=1):
+    """ Lints many recipes in a single pylint run in this process, using 'jobs' processes.
+        Returns the messages of each recipe (by its absolute path), the ones not related to
+        any recipe (like wrong pylint options) are under None
+    """
+    lint_args = _lint_args(conanfile_paths) + ['--jobs={}'.format(jobs)]
+    results = collections.OrderedDict((os.path.abspath(path), []) for path in conanfile_paths)
+    results[None] = []
+    for msg in _lint_in_process(conanfile_paths, lint_args):
+        abspath = os.path.abspath(msg["abspath"]) if msg["abspath"] else None
+        results[abspath if abspath in results else None].append(msg)
+    return results
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Lint recipes with pylint, in a single run")
+    parser.add_argument("paths", nargs="+",
+                        help="Recipes, or folders to look for 'conanfile.py' files in")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of pylint processes, 0 to use all the CPUs")
+    args = parser.parse_args(args)
+
+    conanfile_paths = []
+    for path in args.paths:
+        if os.path.isfile(path):
+            conanfile_paths.append(path)
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            if "conanfile.py" in files:
+                conanfile_paths.append(os.path.join(root, "conanfile.py"))
+
+    failed = 0
+    for path, messages in lint_recipes(conanfile_paths, args.jobs).items():
+        errors = sum(int(msg["type"] == "error") for msg in messages)
+        failed += int(bool(errors))
+        if path:
+            print("{}: {} errors".format(path, errors))
+        for msg in messages:
+            print("    {}".format(_format_message(msg)))
+    print("{} recipes linted, {} with errors".format(len(conanfile_paths), failed))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
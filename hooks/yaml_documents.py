@@ -0,0 +1,57 @@
+# coding=utf-8
+
+""" Parsed YAML documents (conandata.yml, config.yml) shared by the hooks that read them
+    (conan-center and hook_reduce_conandata). It is not a hook, it has to be next to them.
+"""
+
+import collections
+import hashlib
+import os
+import threading
+
+import yaml
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+from conans.util.files import load
+
+
+class YamlDocuments(object):
+    """ Per process cache of parsed YAML documents, keyed by the hash of their content, so every
+        check that needs them shares the same parsed object (do not modify it). Documents are
+        parsed with the libyaml bindings when they are available.
+    """
+
+    max_documents = 32
+
+    def __init__(self):
+        self._documents = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, content):
+        key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._documents:
+                self._documents.move_to_end(key)
+                return self._documents[key]
+        document = yaml.load(content, Loader=YamlLoader)
+        with self._lock:
+            self._documents[key] = document
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        return document
+
+
+yaml_documents = YamlDocuments()
+
+
+def load_yml(path, load=load):
+    """ Parsed document of the file, None if it does not exist. 'load' reads the file as text """
+    if os.path.isfile(path):
+        return yaml_documents.parse(load(path))
+    return None
+
+
+def dump_yml(data):
+    return yaml.dump(data, Dumper=YamlDumper, default_flow_style=False)
@@ -1,14 +1,94 @@
 # coding=utf-8
 
+import argparse
+import hashlib
+import multiprocessing
 import os
-import platform
-import subprocess
+import sys
 
 from conans.errors import ConanException
-from conans.tools import logger
+
+try:
+    from disk_cache import get_cache
+except ImportError:  # Installed without disk_cache.py, the problems are not cached
+    def get_cache(folder_variable, size_variable):
+        return None
 
 
 CONAN_HOOK_YAMLLINT_WERR = "CONAN_YAMLLINT_WERR"
+CONAN_HOOK_YAMLLINT_CACHE_DIR = "CONAN_YAMLLINT_CACHE_DIR"
+CONAN_HOOK_YAMLLINT_CACHE_SIZE = "CONAN_YAMLLINT_CACHE_SIZE"
+
+_yamllint_config = None
+_config_digest = None
+# Problems of the files linted by this process, by the digest of their content
+_problems = {}
+
+
+def _get_config():
+    """ yamllint configuration, built once per process """
+    global _yamllint_config, _config_digest
+    if _yamllint_config is None:
+        import yamllint
+        from yamllint.config import YamlLintConfig
+
+        rules = {
+            "document-start": "disable",
+            "line-length": "disable",
+            "new-lines": "{level: warning}",
+            "empty-lines": "{level: warning}",
+            "indentation": "{level: warning}",
+            "trailing-spaces": "{level: warning}",
+        }
+        content = "{extends: default, rules: {%s}}" % ", ".join("%s: %s" % (r, rules[r]) for r in rules)
+        _yamllint_config = YamlLintConfig(content)
+        _config_digest = hashlib.sha256((content + yamllint.__version__).encode()).hexdigest()
+    return _yamllint_config
+
+
+def _yaml_files(folder, conf):
+    """ The same files the yamllint command would lint for the folder """
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if conf.is_yaml_file(path) and not conf.is_file_ignored(path):
+                yield path
+
+
+def lint_file(path, cache=None):
+    """ (line, column, level, message) of the problems of the YAML file. They are linted again
+        only when the file or the rules change: the problems are kept by this process and in
+        the 'cache' (a disk_cache.DiskCache), if any
+    """
+    from yamllint import linter
+
+    conf = _get_config()
+    with open(path, "rb") as f:
+        content = f.read()
+    key = hashlib.sha256(_config_digest.encode() + b"\0" + content).hexdigest()
+    if key in _problems:
+        return _problems[key]
+
+    problems = cache.get(key) if cache else None
+    if problems is not None:
+        problems = [tuple(problem) for problem in problems]
+    else:
+        # Same as yamllint, that detects the encoding of the bytes read (BOM, UTF-16...)
+        problems = [(problem.line, problem.column, problem.level, problem.message)
+                    for problem in linter.run(content, conf, path)]
+        if cache:
+            cache.put(key, problems)
+    _problems[key] = problems
+    return problems
+
+
+def _get_cache():
+    return get_cache(CONAN_HOOK_YAMLLINT_CACHE_DIR, CONAN_HOOK_YAMLLINT_CACHE_SIZE)
+
+
+def _format_problem(path, problem):
+    return "{}:{}:{}: [{}] {}".format(path, *problem)
 
 
 def pre_export(output, conanfile_path, *args, **kwargs):
@@ -19,45 +99,65 @@ def pre_export(output, conanfile_path, *args, **kwargs):
         return
     output.info("Lint yaml '{}'".format(conanfile_path))
     conanfile_dirname = os.path.dirname(conanfile_path)
-    
-    rules = {
-        "document-start": "disable",
-        "line-length": "disable",
-        "new-lines": "{level: warning}",
-        "empty-lines": "{level: warning}",
-        "indentation": "{level: warning}",
-        "trailing-spaces": "{level: warning}",
-    }
-
-    lint_args = ['-f', 'parsable',
-                 '-d', '"{extends: default, rules: {%s}}"' %
-                 ", ".join("%s: %s" % (r, rules[r]) for r in rules)]
-    lint_args.append('"%s"' % conanfile_dirname.replace('\\', '/'))
-    configfile = os.path.join(conanfile_dirname, "..", "config.yml")
-    if os.path.isfile(configfile):
-        lint_args.append('"%s"' % configfile.replace('\\', '/'))
 
+    errors = 0
+    cache = _get_cache()
     try:
-        command = ['yamllint'] + lint_args
-        command = " ".join(command)
-        shell = bool(platform.system() != "Windows")
-        p = subprocess.Popen(command, shell=shell, bufsize=10,
-                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        yamllint_stdout, yamllint_stderr = p.communicate()
-        yamllint_stdout = yamllint_stdout.decode('utf-8')
+        paths = list(_yaml_files(conanfile_dirname, _get_config()))
+        configfile = os.path.join(conanfile_dirname, "..", "config.yml")
+        if os.path.isfile(configfile):
+            paths.append(configfile)
+        for path in paths:
+            for problem in lint_file(path, cache):
+                output.info(_format_problem(path, problem))
+                errors += int(problem[2] == "error")
+        if cache and cache.written:  # Nothing to remove when all the problems are known
+            cache.evict()
     except Exception as exc:
         output.error("Unexpected error running linter: {}".format(exc))
         return
-    errors = 0
-    for line in yamllint_stdout.splitlines():
-        output.info(line)
-        i = line.find(":")
-        line = line[i:]
-        i = line.find(":")
-        line = line[i:]
-        parts = line.split(' ')
-        errors += int(parts[1] == "[error]")
 
     output.info("YAML Linter detected '{}' errors".format(errors))
     if os.getenv(CONAN_HOOK_YAMLLINT_WERR) and errors:
         raise ConanException("Package recipe has YAML linter errors. Please fix them.")
+
+
+def _lint_file_job(path):
+    return path, lint_file(path, _get_cache())
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Lint the YAML files of the given folders")
+    parser.add_argument("paths", nargs="+", help="YAML files or folders to look for them in")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of processes (default: number of CPUs)")
+    args = parser.parse_args(args)
+
+    paths = []
+    for path in args.paths:
+        paths.extend([path] if os.path.isfile(path) else _yaml_files(path, _get_config()))
+
+    if args.jobs > 1 and len(paths) > 1:
+        pool = multiprocessing.Pool(min(args.jobs, len(paths)))
+        results = pool.imap(_lint_file_job, paths, chunksize=16)
+    else:
+        pool = None
+        results = map(_lint_file_job, paths)
+    errors = 0
+    try:
+        for path, problems in results:
+            for problem in problems:
+                print(_format_problem(path, problem))
+                errors += int(problem[2] == "error")
+    finally:
+        if pool:
+            pool.terminate()
+    cache = _get_cache()
+    if cache:  # The entries are written by the workers
+        cache.evict()
+    print("{} files linted, {} errors".format(len(paths), errors))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,9 +23,10 @@ class TestConanData(ConanClientV2TestCase):
         kwargs = super(TestConanData, self)._get_environ(**kwargs)
         if not os.path.isdir(self.hooks_dir):
             os.makedirs(self.hooks_dir)
-        if not os.path.isfile(os.path.join(self.hooks_dir, 'hook_reduce_conandata.py')):
-            hook_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'hooks', 'hook_reduce_conandata.py')
-            shutil.copy2(hook_path, self.hooks_dir)
+        for name in ('hook_reduce_conandata.py', 'yaml_documents.py'):
+            if not os.path.isfile(os.path.join(self.hooks_dir, name)):
+                hook_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'hooks', name)
+                shutil.copy2(hook_path, self.hooks_dir)
         return kwargs
 
     def test_reduce_conandata(self):
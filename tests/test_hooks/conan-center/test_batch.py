@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from conans import tools
+
+from tests.utils.test_cases.conan_client import ConanClientTestCase
+
+
+class BatchTests(ConanClientTestCase):
+    conanfile = textwrap.dedent("""\
+        from conans import ConanFile, tools
+
+        class AConan(ConanFile):
+            name = "{name}"
+            url = "https://github.com/conan-io/conan-center-index"
+            license = "fake_license"
+            description = "whatever"
+            homepage = "homepage.com"
+            topics = ("fake_topic", "another_fake_topic")
+            settings = "os", "arch", "compiler", "build_type"
+
+            def requirements(self):
+                self.requires("{requirement}")
+
+            def source(self):
+                tools.get(**self.conan_data["sources"][self.version])
+        """)
+    conandata = textwrap.dedent("""\
+        sources:
+          "1.0":
+            url: "https://fake.url/1.0.tar.gz"
+            sha256: "aaaa"
+          "2.0":
+            url: "https://fake.url/2.0.tar.gz"
+            sha256: "bbbb"
+        """)
+    test_package = textwrap.dedent("""\
+        from conans import ConanFile
+
+        class TestPackageConan(ConanFile):
+            def test(self):
+                pass
+        """)
+    config = textwrap.dedent("""\
+        versions:
+          "2.0":
+            folder: all
+          "1.0":
+            folder: all
+        """)
+
+    def _recipe(self, name, requirement):
+        tools.save(os.path.join("recipes", name, "all", "conanfile.py"),
+                   content=self.conanfile.format(name=name, requirement=requirement))
+        tools.save(os.path.join("recipes", name, "all", "conandata.yml"), content=self.conandata)
+        tools.save(os.path.join("recipes", name, "all", "test_package", "conanfile.py"),
+                   content=self.test_package)
+        tools.save(os.path.join("recipes", name, "config.yml"), content=self.config)
+
+    def _batch(self, *args):
+        repository = os.path.join(os.path.dirname(__file__), "..", "..", "..")
+        process = subprocess.run([sys.executable, "-m", "hooks.conan_center_batch",
+                                  os.path.join(os.getcwd(), "recipes")] + list(args),
+                                 cwd=repository, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 universal_newlines=True)
+        return process.returncode, process.stdout
+
+    def test_recipes(self):
+        self._recipe("foo", "zlib/1.2.11")
+        self._recipe("bar", "foo/[>1.0]@user/channel")
+
+        returncode, output = self._batch("--jobs", "2")
+        self.assertEqual(1, returncode, output)
+        self.assertIn("foo/2.0 ({}): 0 errors".format(
+            os.path.join(os.getcwd(), "recipes", "foo", "all", "conanfile.py")), output)
+        self.assertIn("bar/2.0 (", output)
+        self.assertIn("pre_export(): ERROR: [VERSION RANGES (KB-H008)]", output)
+        self.assertNotIn("[RECIPE METADATA (KB-H003)] OK", output)
+        self.assertIn("2 recipes checked, 1 with errors", output)
+        # The recipes are not modified
+        self.assertIn('"1.0":', tools.load(os.path.join("recipes", "foo", "all", "conandata.yml")))
+
+        returncode, output = self._batch("--jobs", "1", "--all-versions", "--verbose")
+        self.assertIn("foo/1.0 (", output)
+        self.assertIn("[RECIPE METADATA (KB-H003)] OK", output)
+        self.assertIn("post_export(): [CONANDATA.YML REDUCE (KB-H031)] OK", output)
+        self.assertIn("pre_source(): [IMMUTABLE SOURCES (KB-H010)] OK", output)
+        self.assertIn("4 recipes checked, 2 with errors", output)
@@ -0,0 +1,80 @@
+import os
+import textwrap
+
+from conans import tools
+
+from tests.utils.binaries import elf_shared_library, macho_dylib, macho_universal, pe_dll
+from tests.utils.test_cases.conan_client import ConanClientTestCase
+
+
+class BinaryDependenciesTests(ConanClientTestCase):
+    conanfile = textwrap.dedent("""\
+        from conans import ConanFile
+
+        class AConan(ConanFile):
+            settings = "os"
+            exports_sources = "{library}"
+
+            def package(self):
+                self.copy("{library}", dst="lib")
+
+            def package_info(self):
+                self.cpp_info.{attribute} = {libs}
+        """)
+
+    def _get_environ(self, **kwargs):
+        kwargs = super(BinaryDependenciesTests, self)._get_environ(**kwargs)
+        kwargs.update({'CONAN_HOOKS': os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                                                   'hooks', 'conan-center'),
+                       # The binaries must be read without any external tool
+                       'OBJDUMP': os.path.join(os.path.dirname(__file__), "missing-objdump")})
+        return kwargs
+
+    def _create(self, library, content, os_, attribute="system_libs", libs=()):
+        with open(library, "wb") as f:
+            f.write(content)
+        tools.save("conanfile.py", content=self.conanfile.format(library=library,
+                                                                 attribute=attribute,
+                                                                 libs=list(libs)))
+        output = self.conan(["create", ".", "name/version@user/test", "-s", "os={}".format(os_)])
+        self.assertNotIn("objdump", output)
+        self.assertNotIn("otool", output)
+        return output
+
+    def test_elf_needed(self):
+        library = "libfoo.so"
+        output = self._create(library, elf_shared_library(["libm.so.6", "libdl.so.2", "libc.so.6"],
+                                                          library),
+                              "Linux", libs=["m"])
+        self.assertIn("[MISSING SYSTEM LIBS (KB-H043)] Library './lib/libfoo.so' links to "
+                      "system library 'dl' but it is not in cpp_info.system_libs.", output)
+        self.assertNotIn("system library 'm'", output)
+
+    def test_pe_imports(self):
+        output = self._create("foo.dll", pe_dll(["KERNEL32.dll", "WS2_32.dll", "shlwapi.dll"]),
+                              "Windows", libs=["shlwapi"])
+        self.assertIn("[MISSING SYSTEM LIBS (KB-H043)] Library './lib/foo.dll' links to "
+                      "system library 'ws2_32' but it is not in cpp_info.system_libs.", output)
+        self.assertNotIn("system library 'shlwapi'", output)
+        self.assertNotIn("system library 'kernel32'", output)
+
+    def test_macho_universal(self):
+        framework = "/System/Library/Frameworks/{0}.framework/Versions/A/{0}"
+        x86_64 = macho_dylib(["/usr/lib/libSystem.B.dylib", framework.format("Security")],
+                             "/usr/local/lib/libfoo.dylib")
+        arm64 = macho_dylib([framework.format("CoreFoundation")], "/usr/local/lib/libfoo.dylib",
+                            cputype=0x0100000c)
+        output = self._create("libfoo.dylib", macho_universal(x86_64, arm64), "Macos",
+                              attribute="frameworks", libs=["Security"])
+        self.assertIn("[MISSING SYSTEM LIBS (KB-H043)] Library './lib/libfoo.dylib' links to "
+                      "system library 'CoreFoundation' but it is not in cpp_info.frameworks.",
+                      output)
+        self.assertNotIn("system library 'Security'", output)
+        self.assertIn("WARN: [APPLE RELOCATABLE SHARED LIBS (KB-H077)] install_name dir of these "
+                      "shared libs is not @rpath: libfoo.dylib", output)
+
+    def test_macho_rpath(self):
+        output = self._create("libfoo.dylib", macho_dylib([], "@rpath/libfoo.dylib"), "Macos",
+                              attribute="frameworks")
+        self.assertIn("[MISSING SYSTEM LIBS (KB-H043)] OK", output)
+        self.assertIn("[APPLE RELOCATABLE SHARED LIBS (KB-H077)] OK", output)
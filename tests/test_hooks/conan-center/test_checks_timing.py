@@ -0,0 +1,63 @@
+import json
+import os
+import textwrap
+
+from conans import tools
+
+from tests.utils.test_cases.conan_client import ConanClientTestCase
+
+
+class ChecksTimingTests(ConanClientTestCase):
+    conanfile = textwrap.dedent("""\
+        from conans import ConanFile
+
+        class AConan(ConanFile):
+            url = "fake_url.com"
+            license = "fake_license"
+            description = "whatever"
+        """)
+
+    def _get_environ(self, **kwargs):
+        kwargs = super(ChecksTimingTests, self)._get_environ(**kwargs)
+        kwargs.update({'CONAN_HOOKS': os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                                                   'hooks', 'conan-center')})
+        return kwargs
+
+    def test_no_timing_by_default(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        output = self.conan(['export', '.', 'name/version@user/channel'])
+        self.assertNotIn("[TIMING]", output)
+
+    def test_summary(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        with tools.environment_append({"CONAN_HOOK_TIMING": "1"}):
+            output = self.conan(['export', '.', 'name/version@user/channel'])
+        self.assertIn("pre_export(): [TIMING] pre_export(): ", output)
+        self.assertIn("post_export(): [TIMING] post_export(): ", output)
+        self.assertIn("pre_export(): [TIMING]   KB-H061 ", output)
+
+    def test_json_lines(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        timing_file = os.path.join(os.getcwd(), "timing.jsonl")
+        with tools.environment_append({"CONAN_HOOK_TIMING_FILE": timing_file}):
+            self.conan(['export', '.', 'name/version@user/channel'])
+
+        with open(timing_file) as f:
+            entries = [json.loads(line) for line in f]
+        phases = [it for it in entries if it["kb_id"] is None]
+        self.assertEqual(["pre_export", "post_export"], [it["phase"] for it in phases])
+        folder_size = [it for it in entries if it["kb_id"] == "KB-H009"]
+        self.assertEqual(1, len(folder_size))
+        self.assertEqual("name/version@user/channel", folder_size[0]["reference"])
+        self.assertEqual("pre_export", folder_size[0]["phase"])
+        self.assertGreaterEqual(folder_size[0]["files"], 1)
+
+    def test_profile(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        profile_file = os.path.join(os.getcwd(), "kb-h061.prof")
+        with tools.environment_append({"CONAN_HOOK_PROFILE": "KB-H061",
+                                       "CONAN_HOOK_PROFILE_FILE": profile_file}):
+            output = self.conan(['export', '.', 'name/version@user/channel'])
+        self.assertIn("[NO BUILD SYSTEM FUNCTIONS (KB-H061)] Profile saved to '{}'"
+                      .format(profile_file), output)
+        self.assertTrue(os.path.isfile(profile_file))
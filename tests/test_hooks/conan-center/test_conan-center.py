@@ -1248,3 +1248,26 @@ class ConanCenterTests(ConanClientTestCase):
         output = self.conan(['export', 'all', 'name/version@user/test'])
         self.assertIn("The patch file 'patches/patch.diff' does not exist.",
                       output)
+
+    def test_comments_are_ignored(self):
+        conanfile = textwrap.dedent("""\
+        from conans import ConanFile, tools
+
+        class AConan(ConanFile):
+            # name = "name"
+            # revision_mode = "scm"
+            def requirements(self):
+                # self.requires("foo/[>1.0]@user/channel")
+                self.requires("bar/1.0@user/channel")  # self.requires.add("foo/1.0@user/channel")
+
+            def package_info(self):
+                # self.cpp_info.names["cmake"] = "Foo"
+                self.cpp_info.names["cmake_find_package"] = "Foo"
+        """)
+        tools.save('conanfile.py', content=conanfile)
+        output = self.conan(['export', '.', 'name/version@user/test'])
+        self.assertIn("ERROR: [RECIPE METADATA (KB-H003)] Conanfile doesn't have 'name' attribute.", output)
+        self.assertIn("[VERSION RANGES (KB-H008)] OK", output)
+        self.assertIn("[NOT ALLOWED ATTRIBUTES (KB-H039)] OK", output)
+        self.assertIn("[NO TARGET NAME (KB-H040)] OK", output)
+        self.assertIn("[NO REQUIRES.ADD() (KB-H044)] OK", output)
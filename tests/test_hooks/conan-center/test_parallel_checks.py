@@ -0,0 +1,51 @@
+import os
+import textwrap
+
+from conans import tools
+from conans.client.command import ERROR_GENERAL
+
+from tests.utils.test_cases.conan_client import ConanClientTestCase
+
+
+class ParallelChecksTests(ConanClientTestCase):
+    conanfile = textwrap.dedent("""\
+        from conans import ConanFile
+
+        class AConan(ConanFile):
+            url = "fake_url.com"
+            license = "fake_license"
+            description = "whatever"
+            topics = ("Conan", "fake_topic")
+            settings = "os", "arch", "compiler", "build_type"
+
+            def requirements(self):
+                self.requires.add("foo/[>1.0]@user/channel")
+        """)
+
+    def _get_environ(self, **kwargs):
+        kwargs = super(ParallelChecksTests, self)._get_environ(**kwargs)
+        kwargs.update({'CONAN_HOOKS': os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                                                   'hooks', 'conan-center')})
+        return kwargs
+
+    @staticmethod
+    def _hook_lines(output):
+        return [line for line in output.splitlines() if "[HOOK - " in line]
+
+    def test_same_output_as_serial(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        serial_output = self.conan(['export', '.', 'name/version@user/channel'])
+        with tools.environment_append({"CONAN_HOOK_JOBS": "8"}):
+            parallel_output = self.conan(['export', '.', 'name/version@user/channel'])
+
+        self.assertIn("ERROR: [VERSION RANGES (KB-H008)]", parallel_output)
+        self.assertIn("WARN: [INVALID TOPICS (KB-H064)]", parallel_output)
+        self.assertEqual(self._hook_lines(serial_output), self._hook_lines(parallel_output))
+
+    def test_error_level(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        with tools.environment_append({"CONAN_HOOK_JOBS": "8", "CONAN_HOOK_ERROR_LEVEL": "40"}):
+            output = self.conan(['export', '.', 'name/version@user/channel'],
+                                expected_return_code=ERROR_GENERAL)
+        self.assertIn("Some checks failed running the hook, check the output", output)
+        self.assertIn("[NO DANGLING PATCHES (KB-H078)] OK", output)
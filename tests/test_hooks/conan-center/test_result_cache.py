@@ -0,0 +1,119 @@
+import json
+import os
+import textwrap
+
+from conans import tools
+
+from tests.utils.test_cases.conan_client import ConanClientTestCase
+
+
+class ResultCacheTests(ConanClientTestCase):
+    conanfile = textwrap.dedent("""\
+        from conans import ConanFile
+
+        class AConan(ConanFile):
+            url = "fake_url.com"
+            license = "fake_license"
+            description = "whatever"
+
+            def requirements(self):
+                self.requires("foo/[>1.0]@user/channel")
+        """)
+
+    def _get_environ(self, **kwargs):
+        kwargs = super(ResultCacheTests, self)._get_environ(**kwargs)
+        kwargs.update({'CONAN_HOOKS': os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                                                   'hooks', 'conan-center')})
+        return kwargs
+
+    @staticmethod
+    def _hook_lines(output):
+        return [line for line in output.splitlines() if "[HOOK - " in line]
+
+    def _export(self, cache_folder, timing_file, reference="name/version@user/channel",
+                folder="recipe"):
+        with tools.environment_append({"CONAN_HOOK_CACHE_DIR": cache_folder,
+                                       "CONAN_HOOK_TIMING_FILE": timing_file}):
+            output = self.conan(['export', folder, reference])
+        with open(timing_file) as f:
+            entries = [json.loads(line) for line in f]
+        os.remove(timing_file)
+        cached = {it["kb_id"] for it in entries if it["cached"]}
+        return output, cached
+
+    def test_replay(self):
+        tools.save('recipe/conanfile.py', content=self.conanfile)
+        cache_folder = os.path.join(os.getcwd(), "cache")
+        timing_file = os.path.join(os.getcwd(), "timing.jsonl")
+
+        output, cached = self._export(cache_folder, timing_file)
+        self.assertEqual(set(), cached)
+        self.assertIn("ERROR: [VERSION RANGES (KB-H008)]", output)
+
+        cached_output, cached = self._export(cache_folder, timing_file)
+        self.assertEqual(self._hook_lines(output), self._hook_lines(cached_output))
+        self.assertIn("KB-H008", cached)
+        self.assertIn("KB-H009", cached)
+        self.assertNotIn("KB-H031", cached)  # It modifies the conandata.yml
+
+        # Other reference or a modified recipe run the checks again
+        _, cached = self._export(cache_folder, timing_file, "other/version@user/channel")
+        self.assertNotIn("KB-H008", cached)
+        tools.save('recipe/conanfile.py', content=self.conanfile.replace("[>1.0]", "1.0"))
+        output, cached = self._export(cache_folder, timing_file)
+        self.assertNotIn("KB-H008", cached)
+        self.assertIn("[VERSION RANGES (KB-H008)] OK", output)
+
+        # Only the checks depending on the recipe folder, when another file changes
+        tools.save('recipe/CMakeLists.txt', content="cmake_minimum_required(VERSION 3.15)")
+        _, cached = self._export(cache_folder, timing_file)
+        self.assertIn("KB-H008", cached)
+        self.assertNotIn("KB-H009", cached)
+
+    def test_paths(self):
+        test_conanfile = textwrap.dedent("""\
+            from conans import ConanFile, tools
+
+            class TestConan(ConanFile):
+                def test(self):
+                    if not tools.cross_building(self.settings):
+                        pass
+            """)
+        for folder in ("recipe", "other"):
+            tools.save(os.path.join(folder, "conanfile.py"), content=self.conanfile)
+            tools.save(os.path.join(folder, "test_package", "conanfile.py"), content=test_conanfile)
+        cache_folder = os.path.join(os.getcwd(), "cache")
+        timing_file = os.path.join(os.getcwd(), "timing.jsonl")
+        self._export(cache_folder, timing_file)
+
+        # The paths in the messages replayed are the ones of the recipe exported
+        output, cached = self._export(cache_folder, timing_file, folder="other")
+        self.assertIn("KB-H062", cached)
+        self.assertIn("syntax in {} may not work".format(
+            os.path.join(os.getcwd(), "other", "test_package", "conanfile.py")), output)
+        self.assertNotIn(os.path.join(os.getcwd(), "recipe"), output)
+
+        # Paths of the recipe files do not depend on the folder the recipe is exported from
+        tools.save(os.path.join("recipe", "CMakeLists.txt"), content="set(CMAKE_VERBOSE_MAKEFILE ON)")
+        output, _ = self._export(cache_folder, timing_file)
+        self.assertIn("Remove it from CMakeLists.txt.", output)
+        with tools.chdir("recipe"):
+            output, cached = self._export(cache_folder, timing_file, folder=".")
+        self.assertIn("KB-H028", cached)
+        self.assertIn("KB-H046", cached)
+        self.assertIn("The CMake file '{}' must contain".format(os.path.join(".", "CMakeLists.txt")),
+                      output)
+        self.assertIn("Remove it from CMakeLists.txt.", output)
+
+    def test_eviction(self):
+        tools.save('recipe/conanfile.py', content=self.conanfile)
+        cache_folder = os.path.join(os.getcwd(), "cache")
+        timing_file = os.path.join(os.getcwd(), "timing.jsonl")
+        with tools.environment_append({"CONAN_HOOK_CACHE_SIZE": "0.002"}):
+            self._export(cache_folder, timing_file)
+        entries = [entry for folder in os.listdir(cache_folder)
+                   for entry in os.listdir(os.path.join(cache_folder, folder))]
+        self.assertTrue(entries)
+        size = sum(os.path.getsize(os.path.join(cache_folder, entry[:2], entry))
+                   for entry in entries)
+        self.assertLessEqual(size, 0.002 * 1024 * 1024)
@@ -2,7 +2,6 @@
 
 import os
 import textwrap
-import unittest
 
 from conans import tools
 from tests.utils.test_cases.conan_client import ConanClientTestCase
@@ -58,7 +57,6 @@ class VersionRanges(ConanClientTestCase):
         output = self.conan(['export', '.', 'name/version@jgsogo/test'])
         self.assertIn("Possible use of version ranges", output)
 
-    @unittest.expectedFailure
     def test_string_in_comment(self):
         conanfile = textwrap.dedent("""
             from conans import ConanFile
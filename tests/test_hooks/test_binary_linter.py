@@ -0,0 +1,251 @@
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+from unittest import mock
+
+from conans import tools
+
+from tests.utils.binaries import ar_archive, elf_header, macho_object, macho_universal, pe_dll
+from tests.utils.test_cases.conan_client import ConanClientTestCase
+
+
+class BinaryLinterTests(ConanClientTestCase):
+    conanfile = textwrap.dedent("""\
+        import os
+        from conans import ConanFile
+
+        class AConan(ConanFile):
+            settings = "os", "arch", "compiler"
+            options = {"shared": [True, False]}
+            default_options = {"shared": False}
+            exports_sources = "*"
+
+            def package(self):
+                self.copy("*.h", dst="include")
+                self.copy("*.so", dst="lib")
+                self.copy("*.dll", dst="bin")
+                self.copy("*.dylib", dst="lib")
+                self.copy("*.a", dst="lib")
+                self.copy("LICENSE", dst="licenses")
+                self.copy("*.dat", dst="res")
+        """)
+
+    hook = os.path.join(os.path.dirname(__file__), '..', '..', 'hooks', 'binary_linter')
+
+    def _get_environ(self, **kwargs):
+        kwargs = super(BinaryLinterTests, self)._get_environ(**kwargs)
+        kwargs.update({'CONAN_HOOKS': self.hook})
+        return kwargs
+
+    def test_binaries(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        tools.save('foo.h', content="#pragma once\n")
+        tools.save('LICENSE', content="MIT")
+        tools.save('foo.dat', content="data")
+        tools.save('libfoo.a', content="!<arch>\n")
+        with open('libfoo.so', 'wb') as f:
+            f.write(elf_header())
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Linux',
+                             '-s', 'arch=x86_64'])
+        self.assertIn('checking file "', output)
+        self.assertIn('libfoo.so" is shared library, but option "shared" is set to "False"', output)
+        self.assertIn('checking archive "', output)
+        self.assertIn("skipped 3 files (headers: 1, other: 1, text: 1)", output)
+        self.assertNotIn("invalid", output)
+
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Linux',
+                             '-s', 'arch=armv8', '-o', 'name:shared=True'])
+        self.assertIn('libfoo.so" invalid machine type', output)
+        self.assertNotIn("is shared library", output)
+
+    def test_jobs(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        for name in ("a", "b", "c"):
+            with open('lib%s.so' % name, 'wb') as f:
+                f.write(elf_header(machine=183 if name == "b" else 62))
+        outputs = []
+        for jobs in ("1", "3"):
+            with tools.environment_append({"CONAN_BINARY_LINTER_JOBS": jobs}):
+                output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Linux',
+                                     '-s', 'arch=x86_64'])
+            outputs.append([line for line in output.splitlines() if "binary_linter.py]" in line])
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(1, len([line for line in outputs[0] if "invalid machine type" in line]))
+        self.assertIn("libb.so", [line for line in outputs[0] if "invalid" in line][0])
+        self.assertEqual(3, len([line for line in outputs[0] if "is shared library" in line]))
+
+    def test_pe_imports(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        with open('foo.dll', 'wb') as f:
+            f.write(pe_dll(["KERNEL32.dll", "VCRUNTIME140.dll", "msys-2.0.dll"]))
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Windows',
+                             '-s', 'arch=x86_64', '-s', 'compiler=Visual Studio',
+                             '-s', 'compiler.version=16', '-s', 'compiler.runtime=MD',
+                             '-o', 'name:shared=True'])
+        self.assertIn('foo.dll" imports libraries "vcruntime140.dll"', output)
+        self.assertIn('WARN: "%s" imports library "msys-2.0.dll"'
+                      % os.path.join(self._package_folder(output), "bin", "foo.dll"), output)
+        self.assertIn('foo.dll" doesn\'t import libraries "msvcr80d.dll", "msvcr80.dll", ', output)
+        self.assertEqual(1, output.count("doesn't import"))
+        self.assertNotIn("ERROR:", output)
+
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Windows',
+                             '-s', 'arch=x86_64', '-s', 'compiler=Visual Studio',
+                             '-s', 'compiler.version=15', '-s', 'compiler.runtime=MDd',
+                             '-s', 'os.subsystem=cygwin', '-o', 'name:shared=True'])
+        self.assertIn('ERROR: "%s" doesn\'t import library "vcruntime140d.dll"'
+                      % os.path.join(self._package_folder(output), "bin", "foo.dll"), output)
+        self.assertIn('foo.dll" doesn\'t import library "cygwin1.dll"', output)
+        self.assertIn('foo.dll" imports library "vcruntime140.dll"', output)
+
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Windows',
+                             '-s', 'arch=x86_64', '-s', 'compiler=Visual Studio',
+                             '-s', 'compiler.version=17', '-s', 'compiler.runtime=MD',
+                             '-o', 'name:shared=True'])
+        self.assertIn('foo.dll" imports libraries "vcruntime140.dll"', output)
+        self.assertNotIn("ERROR:", output)
+
+        # The runtime of versions newer than the hook is not known
+        settings_path = os.path.join(self._working_dir, "home", ".conan", "settings.yml")
+        settings = tools.load(settings_path)
+        tools.save(settings_path, settings.replace('"16", "17"]', '"16", "17", "18"]', 1))
+        try:
+            output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Windows',
+                                 '-s', 'arch=x86_64', '-s', 'compiler=Visual Studio',
+                                 '-s', 'compiler.version=18', '-s', 'compiler.runtime=MD',
+                                 '-o', 'name:shared=True'])
+        finally:
+            tools.save(settings_path, settings)
+        self.assertIn('WARN: "%s" runtime library of Visual Studio 18 is unknown, the runtime '
+                      'imports are not checked'
+                      % os.path.join(self._package_folder(output), "bin", "foo.dll"), output)
+        self.assertNotIn("vcruntime140", output)
+
+    @staticmethod
+    def _package_folder(output):
+        return output.split("Package folder ")[1].splitlines()[0]
+
+    def test_archives(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        x86_64, armv8 = elf_header(file_type=1), elf_header(machine=183, file_type=1)
+        with open('libfoo.a', 'wb') as f:
+            f.write(ar_archive([("foo.o", x86_64), ("a_very_long_object_name.o", x86_64),
+                                ("another_long_object_name.o", armv8), ("bar.o", armv8)]))
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Linux',
+                             '-s', 'arch=x86_64'])
+        self.assertIn('libfoo.a" member "another_long_object_name.o" invalid machine type 0xb7, '
+                      'expected 0x3e', output)
+        self.assertNotIn('"bar.o"', output)
+
+        with open('libfoo.a', 'wb') as f:
+            f.write(ar_archive([("foo.o", macho_object(0x1000007)),
+                                ("a_very_long_object_name.o", macho_object(0x100000c))], bsd=True))
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Macos',
+                             '-s', 'arch=x86_64'])
+        self.assertIn('libfoo.a" member "a_very_long_object_name.o" invalid machine type 0x100000c, '
+                      'expected 0x1000007', output)
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Linux',
+                             '-s', 'arch=x86_64'])
+        self.assertIn('libfoo.a" member "foo.o" invalid object format Mach-O, expected ELF', output)
+
+    def test_cache(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        tools.save('foo.h', content="#pragma once\n")
+        with open('libfoo.so', 'wb') as f:
+            f.write(elf_header())
+        with open('libfoo.a', 'wb') as f:
+            f.write(ar_archive([("foo.o", elf_header(machine=183, file_type=1))]))
+        cache_folder = os.path.join(os.getcwd(), "cache")
+
+        def _create(arch, jobs="1"):
+            with tools.environment_append({"CONAN_BINARY_LINTER_CACHE_DIR": cache_folder,
+                                           "CONAN_BINARY_LINTER_JOBS": jobs}):
+                output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Linux',
+                                     '-s', 'arch=%s' % arch])
+            return [line for line in output.splitlines() if "binary_linter.py]" in line]
+
+        def _cache_command(command):
+            hook = os.path.join(os.path.dirname(__file__), '..', '..', 'hooks', 'binary_linter.py')
+            return subprocess.check_output([sys.executable, hook, command, "--cache-dir",
+                                            cache_folder], universal_newlines=True)
+
+        output = _create("x86_64")
+        self.assertEqual(2, len([entry for folder in os.listdir(cache_folder)
+                                 for entry in os.listdir(os.path.join(cache_folder, folder))]))
+        self.assertEqual(output, _create("x86_64"))
+        self.assertEqual(output, _create("x86_64", jobs="2"))
+        self.assertIn("2 entries", _cache_command("info"))
+
+        output = _create("armv8")
+        self.assertTrue([line for line in output if 'libfoo.so" invalid machine type' in line])
+        self.assertFalse([line for line in output if "invalid machine type 0xb7" in line])
+        self.assertIn("4 entries", _cache_command("info"))
+        self.assertIn("0 entries", _cache_command("clear"))
+
+    def test_without_disk_cache(self):
+        # The hook can be installed on its own, the findings are not cached then
+        hooks_folder = os.path.join(os.getcwd(), "hooks")
+        tools.mkdir(hooks_folder)
+        shutil.copy2(self.hook + ".py", hooks_folder)
+        self.hook = os.path.join(hooks_folder, "binary_linter")
+        tools.save('conanfile.py', content=self.conanfile)
+        with open('libfoo.so', 'wb') as f:
+            f.write(elf_header())
+        cache_folder = os.path.join(os.getcwd(), "cache")
+        # Other tests leave the modules of the hooks folder loaded by this process
+        with mock.patch.dict(sys.modules, {"disk_cache": None}):
+            sys.modules.pop("binary_linter", None)
+            with tools.environment_append({"CONAN_BINARY_LINTER_CACHE_DIR": cache_folder}):
+                output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Linux',
+                                     '-s', 'arch=x86_64'])
+        self.assertIn('libfoo.so" is shared library, but option "shared" is set to "False"', output)
+        self.assertFalse(os.path.exists(cache_folder))
+
+    def test_macho(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        with open('libfoo.dylib', 'wb') as f:
+            f.write(macho_object(0x100000c, file_type=6))
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Macos',
+                             '-s', 'arch=x86_64'])
+        self.assertIn('libfoo.dylib" invalid machine type CPU_TYPES.ARM64, expected CPU_TYPES.x86_64',
+                      output)
+        self.assertIn('libfoo.dylib" is shared library, but option "shared" is set to "False"', output)
+
+    def test_macho_universal(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        with open('libfoo.dylib', 'wb') as f:
+            f.write(macho_universal(macho_object(0x1000007, file_type=6),
+                                    macho_object(0x100000c, file_type=6)))
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Macos',
+                             '-s', 'arch=x86_64', '-o', 'name:shared=True'])
+        self.assertIn('libfoo.dylib" slice 0 (CPU_TYPES.x86_64) OK', output)
+        self.assertIn('libfoo.dylib" slice 1 invalid machine type CPU_TYPES.ARM64, expected '
+                      'CPU_TYPES.x86_64', output)
+
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Macos',
+                             '-s', 'arch=armv8'])
+        self.assertIn('libfoo.dylib" slice 1 (CPU_TYPES.ARM64) OK', output)
+        self.assertIn('libfoo.dylib" slice 0 invalid machine type CPU_TYPES.x86_64', output)
+        self.assertIn('libfoo.dylib" slice 0 is shared library, but option "shared" is set to "False"',
+                      output)
+        self.assertIn('libfoo.dylib" slice 1 is shared library, but option "shared" is set to "False"',
+                      output)
+
+    def test_macho_universal_file_types(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        with open('libfoo.dylib', 'wb') as f:
+            f.write(macho_universal(macho_object(0x1000007, file_type=6),
+                                    macho_object(0x100000c, file_type=8)))  # MH_BUNDLE
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Macos',
+                             '-s', 'arch=x86_64', '-o', 'name:shared=True'])
+        self.assertIn('libfoo.dylib" slice 1 invalid file type FILE_TYPES.BUNDLE, expected '
+                      'FILE_TYPES.DYLIB', output)
+        self.assertNotIn('slice 0 invalid file type', output)
+
+        output = self.conan(['create', '.', 'name/version@user/channel', '-s', 'os=Macos',
+                             '-s', 'arch=x86_64'])
+        self.assertIn('libfoo.dylib" slice 0 is shared library, but option "shared" is set to "False"',
+                      output)
+        self.assertNotIn('slice 1 is shared library', output)
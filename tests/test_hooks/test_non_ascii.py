@@ -1,3 +1,4 @@
+import codecs
 import os
 import textwrap
 
@@ -33,3 +34,54 @@ class NonASCIITests(ConanClientTestCase):
             .replace("A Terra é Azul", "The Earth is Blue"))
         output = self.conan(['export', '.', 'name/version@user/channel'])
         self.assertNotIn("ERROR:", output)
+
+    def test_exported_files(self):
+        conanfile = textwrap.dedent("""\
+            from conans import ConanFile
+
+            class AConan(ConanFile):
+                exports = "CMakeLists.txt", "data.bin"
+                exports_sources = "patches/*"
+            """)
+        tools.save('conanfile.py', content=conanfile)
+        tools.save('CMakeLists.txt', content="project(foo)\n")
+        tools.save('data.bin', content=b"\0" * 1024 * 1024 + "€".encode("utf-8"))
+        tools.save(os.path.join('patches', '0001-fix.patch'),
+                   content="--- a/foo.c\n+++ b/foo.c\n+/* Fixed by Jérôme */\n")
+        tools.save('conandata.yml', content='sources:\n  "version":\n    url: "https://foo.bar/€"\n')
+        output = self.conan(['export', '.', 'name/version@user/channel'])
+        self.assertNotIn("ERROR:", output)
+        self.assertIn("WARN: The file 'patches/0001-fix.patch' contains a non-ascii character at "
+                      "line (3).", output)
+        self.assertIn("bad characters: \\xe9 (LATIN SMALL LETTER E WITH ACUTE) "
+                      "\\xf4 (LATIN SMALL LETTER O WITH CIRCUMFLEX)", output)
+        self.assertIn("WARN: The file 'conandata.yml' contains a non-ascii character at line (3).",
+                      output)
+        self.assertNotIn("'CMakeLists.txt' contains", output)
+        self.assertNotIn("'data.bin' contains", output)
+
+        # Binaries are only read until their first NUL byte
+        with tools.environment_append({"CONAN_NON_ASCII_MAX_BYTES": str(100 * 1024)}):
+            output = self.conan(['export', '.', 'name/version@user/channel'])
+        self.assertNotIn("Stopped checking", output)
+        self.assertIn("WARN: The file 'patches/0001-fix.patch' contains a non-ascii character at "
+                      "line (3).", output)
+
+        with tools.environment_append({"CONAN_NON_ASCII_MAX_BYTES": "20"}):
+            output = self.conan(['export', '.', 'name/version@user/channel'])
+        self.assertIn("WARN: Stopped checking the exported files for non-ascii characters at "
+                      "'data.bin', the limit of CONAN_NON_ASCII_MAX_BYTES is reached", output)
+        self.assertNotIn("'patches/0001-fix.patch' contains", output)
+
+    def test_encodings(self):
+        conanfile = self.conanfile.replace("Юрий Алексеевич Гагарин", "Yuri Alekseyevich Gagarin")
+        tools.save('conanfile.py', content=codecs.BOM_UTF8 + conanfile.replace(
+            "A Terra é Azul", "The Earth is Blue").encode("utf-8"))
+        output = self.conan(['export', '.', 'name/version@user/channel'])
+        self.assertNotIn("ERROR:", output)
+
+        tools.save('conanfile.py', content=("# -*- coding: cp1252 -*-\n" + conanfile).encode("cp1252"))
+        output = self.conan(['export', '.', 'name/version@user/channel'])
+        self.assertIn("ERROR: The file 'conanfile.py' contains a non-ascii character at line (6).",
+                      output)
+        self.assertIn("bad characters: \\xe9 (LATIN SMALL LETTER E WITH ACUTE)", output)
@@ -1,6 +1,8 @@
 # coding=utf-8
 
 import os
+import subprocess
+import sys
 import textwrap
 import unittest
 
@@ -215,4 +217,91 @@ class RecipeLinterTests(ConanClientTestCase):
             output = self.conan(['export', 'consumer.py', 'consumer/version@'])
             self.assertIn("pre_export(): Lint recipe", output)  # Hook run without errors
             self.assertIn("pre_export(): Linter detected '0' errors", output)
-            self.assertNotIn("(no-name-in-module)", output)
\ No newline at end of file
+            self.assertNotIn("(no-name-in-module)", output)
+
+class RecipeLinterInProcessTests(ConanClientTestCase):
+    conanfile = textwrap.dedent(r"""
+        from conans import ConanFile
+
+        class TestConan(ConanFile):
+            def build(self):
+                for k, v in {}.iteritems():
+                    pass
+        """)
+
+    def _get_environ(self, **kwargs):
+        kwargs = super(RecipeLinterInProcessTests, self)._get_environ(**kwargs)
+        kwargs.update({'CONAN_HOOKS': os.path.join(os.path.dirname(
+            __file__), '..', '..', 'hooks', 'recipe_linter'),
+            'CONAN_PYLINT_IN_PROCESS': "1",
+            'CONAN_PYLINT_RECIPE_PLUGINS': ""})  # 'conans.pylint_plugin' needs pylint < 3
+        return kwargs
+
+    def test_in_process(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        output = self.conan(['export', '.', 'name/version@'])
+        self.assertIn("pre_export(): conanfile.py:6:20: E1101: Instance of 'dict' has no "
+                      "'iteritems' member (no-member)", output)
+        self.assertIn("pre_export(): conanfile.py:6:12: W0612: Unused variable 'k' "
+                      "(unused-variable)", output)
+        self.assertIn("pre_export(): Linter detected '1' errors", output)
+
+        # The recipe is linted again after a change, even in the same process
+        tools.save('conanfile.py', content=self.conanfile.replace("{}.iteritems()",
+                                                                  "{}.items()"))
+        with environment_append({"CONAN_PYLINT_WERR": "1"}):
+            output = self.conan(['export', '.', 'name/version@'])
+        self.assertNotIn("(no-member)", output)
+        self.assertIn("pre_export(): Linter detected '0' errors", output)
+
+    def test_test_package(self):
+        tools.save('conanfile.py', content=self.conanfile.replace("{}.iteritems()", "{}.items()"))
+        tools.save(os.path.join('test_package', 'conanfile.py'), content=self.conanfile)
+        output = self.conan(['export', '.', 'name/version@'])
+        self.assertIn("pre_export(): {}:6:20: E1101: Instance of 'dict' has no 'iteritems' "
+                      "member (no-member)".format(os.path.join("test_package", "conanfile.py")),
+                      output)
+        self.assertIn("pre_export(): Linter detected '1' errors", output)
+
+    def test_cache(self):
+        tools.save('conanfile.py', content=self.conanfile)
+        with environment_append({"CONAN_PYLINT_CACHE_DIR": os.path.join(os.getcwd(), "cache"),
+                                 "CONAN_PYLINT_WERR": "1"}):
+            output = self.conan(['export', '.', 'name/version@'], expected_return_code=ERROR_GENERAL)
+            self.assertNotIn("taken from the cache", output)
+            cached_output = self.conan(['export', '.', 'name/version@'],
+                                       expected_return_code=ERROR_GENERAL)
+            self.assertIn("pre_export(): Linter messages taken from the cache", cached_output)
+            self.assertIn("pre_export(): conanfile.py:6:20: E1101: Instance of 'dict' has no "
+                          "'iteritems' member (no-member)", cached_output)
+            self.assertIn("pre_export(): Linter detected '1' errors", cached_output)
+            self.assertIn("pre_export(): Package recipe has linter errors. Please fix them.",
+                          cached_output)
+
+            # A change in the configuration lints the recipe again
+            tools.save('pylintrc', content="[FORMAT]\nindent-string='  '")
+            with environment_append({"CONAN_PYLINTRC": os.path.join(os.getcwd(), "pylintrc")}):
+                output = self.conan(['export', '.', 'name/version@'],
+                                    expected_return_code=ERROR_GENERAL)
+            self.assertNotIn("taken from the cache", output)
+            self.assertIn("(bad-indentation)", output)
+
+    def test_batch(self):
+        for name in ("foo", "bar"):
+            tools.save(os.path.join('recipes', name, 'all', 'conanfile.py'),
+                       content=self.conanfile.replace("{}.iteritems()", "{}.items()"))
+        tools.save(os.path.join('recipes', 'bar', 'all', 'test_package', 'conanfile.py'),
+                   content=self.conanfile)
+        hook = os.path.join(os.path.dirname(__file__), '..', '..', 'hooks', 'recipe_linter.py')
+        with environment_append(self._get_environ()):
+            process = subprocess.run([sys.executable, hook, 'recipes', '--jobs', '2'],
+                                     stdout=subprocess.PIPE, universal_newlines=True)
+        self.assertEqual(1, process.returncode)
+        test_package = os.path.join(os.getcwd(), 'recipes', 'bar', 'all', 'test_package',
+                                    'conanfile.py')
+        self.assertIn("{}: 1 errors".format(test_package), process.stdout)
+        self.assertIn("{}:6:20: E1101: Instance of 'dict' has no 'iteritems' member "
+                      "(no-member)".format(os.path.relpath(test_package)), process.stdout)
+        self.assertIn("{}: 0 errors".format(os.path.join(os.getcwd(), 'recipes', 'foo', 'all',
+                                                         'conanfile.py')), process.stdout)
+        self.assertIn("3 recipes linted, 1 with errors", process.stdout)
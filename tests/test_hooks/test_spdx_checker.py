@@ -85,3 +85,26 @@ class SPDXCheckerTest(ConanClientTestCase):
 
         self.assertNotIn("recipe doesn't have a license attribute", output)
         self.assertIn("don't know how to process license attribute which is neither string nor tuple", output)
+
+    def test_license_expressions(self):
+        conanfile = textwrap.dedent("""\
+        from conans import ConanFile
+        class AConan(ConanFile):
+            license = ("Apache-2.0 WITH LLVM-exception", "MIT OR BSL-1.0",
+                       "(LGPL-2.1-or-later AND MIT) or Invalid-License", "MIT WITH Invalid-exception",
+                       "MIT OR", "GPL-2.0+")
+        """)
+        tools.save('conanfile.py', content=conanfile)
+        output = self.conan(['export', '.', 'name/version@user/channel'])
+
+        self.assertIn('license "Apache-2.0 WITH LLVM-exception" is a valid SPDX license expression',
+                      output)
+        self.assertIn('license "MIT OR BSL-1.0" is a valid SPDX license expression', output)
+        self.assertIn('license "(LGPL-2.1-or-later AND MIT) or Invalid-License" is not a valid SPDX '
+                      'license expression: "Invalid-License" is not a valid SPDX license identifier',
+                      output)
+        self.assertIn('license "MIT WITH Invalid-exception" is not a valid SPDX license expression: '
+                      '"Invalid-exception" is not a valid SPDX license exception identifier', output)
+        self.assertIn('license "MIT OR" is not a valid SPDX license expression: unexpected end of '
+                      'expression', output)
+        self.assertIn('WARN: license "GPL-2.0+" is a deprecated SPDX license identifier', output)
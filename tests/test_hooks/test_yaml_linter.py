@@ -1,6 +1,8 @@
 # coding=utf-8
 
 import os
+import subprocess
+import sys
 import textwrap
 import unittest
 
@@ -72,3 +74,72 @@ class YAMLLinterTests(ConanClientTestCase):
         recipe_path = os.path.join(os.getcwd(), "path spaces", "conanfile.py")
         self.assertIn("pre_export(): Lint yaml '{}'".format(recipe_path), output)
         self.assertIn("pre_export(): YAML Linter detected '0' errors", output)
+
+    def test_encoding(self):
+        conandatafile = textwrap.dedent(r"""
+            sources:
+                "version":
+                    url: "https://url.to/name/version.tar.xz"
+            sources:
+            """)
+        tools.save('conanfile.py', content=self.conanfile)
+        # yamllint detects the encoding by the BOM
+        with open('conandata.yml', 'wb') as f:
+            f.write(conandatafile.encode("utf-16"))
+        output = self.conan(['export', '.', 'name/version@'])
+        self.assertNotIn("Unexpected error", output)
+        self.assertIn("conandata.yml:5:1:"
+                      " [error] duplication of key \"sources\" in mapping (key-duplicates)", output)
+
+    def test_cache(self):
+        conandatafile = textwrap.dedent(r"""
+            sources:
+                "version":
+                    url: "https://url.to/name/version.tar.xz"
+            patches:
+            patches:
+            """)
+        tools.save(os.path.join("all", "conanfile.py"), content=self.conanfile)
+        tools.save(os.path.join("all", "conandata.yml"), content=conandatafile)
+        tools.save("config.yml", content='versions:\n  "version":\n    folder: all\n')
+        cache_folder = os.path.join(os.getcwd(), "cache")
+
+        def _entries():
+            return sorted(entry for folder in os.listdir(cache_folder)
+                          for entry in os.listdir(os.path.join(cache_folder, folder)))
+
+        with environment_append({"CONAN_YAMLLINT_CACHE_DIR": cache_folder}):
+            output = self.conan(['export', 'all', 'name/version@'])
+            self.assertIn("conandata.yml:6:1: [error] duplication of key \"patches\" in mapping "
+                          "(key-duplicates)", output)
+            entries = _entries()
+            self.assertEqual(2, len(entries))
+            hook_lines = [line for line in output.splitlines() if "pre_export()" in line]
+            output = self.conan(['export', 'all', 'name/version@'])
+            self.assertEqual(hook_lines,
+                             [line for line in output.splitlines() if "pre_export()" in line])
+            self.assertEqual(entries, _entries())
+
+            # Only the modified file is linted again
+            tools.save(os.path.join("all", "conandata.yml"), content=conandatafile + "\n")
+            output = self.conan(['export', 'all', 'name/version@'])
+            self.assertIn("conandata.yml:7:1: [warning] too many blank lines (1 > 0) "
+                          "(empty-lines)", output)
+            self.assertEqual(3, len(_entries()))
+
+    def test_batch(self):
+        tools.save(os.path.join("recipes", "foo", "all", "conandata.yml"),
+                   content="sources:\nsources:\n")
+        tools.save(os.path.join("recipes", "foo", "config.yml"),
+                   content='versions:\n  "1.0":\n    folder: all\n')
+        tools.save(os.path.join("recipes", "bar", "config.yml"), content="versions:  \n")
+        hook = os.path.join(os.path.dirname(__file__), '..', '..', 'hooks', 'yaml_linter.py')
+        process = subprocess.run([sys.executable, hook, "recipes", "--jobs", "2"],
+                                 stdout=subprocess.PIPE, universal_newlines=True)
+        self.assertEqual(1, process.returncode)
+        self.assertIn("{}:2:1: [error] duplication of key \"sources\" in mapping (key-duplicates)"
+                      .format(os.path.join("recipes", "foo", "all", "conandata.yml")),
+                      process.stdout)
+        self.assertIn("{}:1:10: [warning] trailing spaces (trailing-spaces)"
+                      .format(os.path.join("recipes", "bar", "config.yml")), process.stdout)
+        self.assertIn("3 files linted, 1 errors", process.stdout)
@@ -0,0 +1,115 @@
+# coding=utf-8
+
+""" Minimal binaries, only with the headers the hooks read """
+
+import struct
+
+
+def elf_header(machine=62, file_type=3):
+    """ ELF64 little endian header, without sections (x86_64 shared library by default) """
+    return b"\x7fELF" + bytes([2, 1, 1]) + b"\0" * 9 + \
+        struct.pack("<HHIQQQIHHHHHH", file_type, machine, 1, 0, 0, 0, 0, 64, 56, 0, 64, 0, 0)
+
+
+def elf_shared_library(needed, soname):
+    """ Minimal ELF64 little endian shared library, only with the headers read by the hook """
+    strtab = b"\0"
+    indexes = []
+    for name in list(needed) + [soname]:
+        indexes.append(len(strtab))
+        strtab += name.encode() + b"\0"
+    strtab_offset = 64 + 2 * 56
+    dynamic_offset = strtab_offset + len(strtab)
+    entries = [(1, index) for index in indexes[:-1]]  # DT_NEEDED
+    entries += [(14, indexes[-1]), (5, strtab_offset), (10, len(strtab)), (0, 0)]
+    dynamic = b"".join(struct.pack("<qQ", tag, value) for tag, value in entries)
+    size = dynamic_offset + len(dynamic)
+
+    header = b"\x7fELF" + bytes([2, 1, 1]) + b"\0" * 9
+    header += struct.pack("<HHIQQQIHHHHHH", 3, 62, 1, 0, 64, 0, 0, 64, 56, 2, 64, 0, 0)
+    program_headers = struct.pack("<IIQQQQQQ", 1, 5, 0, 0, 0, size, size, 0x1000)  # PT_LOAD
+    program_headers += struct.pack("<IIQQQQQQ", 2, 6, dynamic_offset, dynamic_offset,
+                                   dynamic_offset, len(dynamic), len(dynamic), 8)  # PT_DYNAMIC
+    return header + program_headers + strtab + dynamic
+
+
+def pe_dll(needed):
+    """ Minimal PE32+ x86_64 DLL with an .idata section importing 'needed' """
+    section_rva, section_offset = 0x1000, 0x200
+    thunks_rva = section_rva + (len(needed) + 1) * 20  # Empty lookup and address tables
+    names_offset = (len(needed) + 1) * 20 + 8
+    descriptors, names = b"", b""
+    for name in needed:
+        descriptors += struct.pack("<IIIII", thunks_rva, 0, 0,
+                                   section_rva + names_offset + len(names), thunks_rva)
+        names += name.encode() + b"\0"
+    section = descriptors + b"\0" * 20 + b"\0" * 8 + names
+
+    optional_header = bytearray(112 + 16 * 8)
+    struct.pack_into("<H", optional_header, 0, 0x20b)
+    struct.pack_into("<I", optional_header, 108, 16)
+    struct.pack_into("<II", optional_header, 112 + 8, section_rva, len(section))
+    section_header = struct.pack("<8sIIIIIIHHI", b".idata", len(section), section_rva,
+                                 len(section), section_offset, 0, 0, 0, 0, 0xc0000040)
+
+    dos_header = bytearray(64)
+    dos_header[:2] = b"MZ"
+    struct.pack_into("<I", dos_header, 0x3c, 64)
+    coff_header = b"PE\0\0" + struct.pack("<HHIIIHH", 0x8664, 1, 0, 0, 0, len(optional_header),
+                                          0x2022)
+    headers = bytes(dos_header) + coff_header + bytes(optional_header) + section_header
+    return headers.ljust(section_offset, b"\0") + section
+
+
+def macho_object(cputype, file_type=1):
+    """ 64 bits little endian Mach-O header (an object file by default) """
+    return struct.pack("<IiiIIIII", 0xfeedfacf, cputype, 3, file_type, 0, 0, 0, 0)
+
+
+def macho_dylib(needed, install_name, cputype=0x01000007):
+    """ Minimal 64 bits little endian Mach-O dylib """
+    def _dylib_command(cmd, name):
+        name = name.encode() + b"\0"
+        name += b"\0" * (-len(name) % 8)
+        return struct.pack("<IIIIII", cmd, 24 + len(name), 24, 0, 0, 0) + name
+
+    commands = _dylib_command(0xd, install_name)  # LC_ID_DYLIB
+    commands += b"".join(_dylib_command(0xc, name) for name in needed)  # LC_LOAD_DYLIB
+    header = struct.pack("<IiiIIIII", 0xfeedfacf, cputype, 3, 6, len(needed) + 1, len(commands),
+                         0, 0)
+    return header + commands
+
+
+def ar_archive(members, bsd=False):
+    """ ar archive with the (name, content) members, with GNU or BSD long names """
+    def _header(name, size):
+        return ("%-16s%-12s%-6s%-6s%-8s%-10s`\n" % (name, 0, 0, 0, 644, size)).encode()
+
+    data, long_names = b"", b""
+    for name, content in members:
+        if bsd:
+            if len(name) > 15:
+                content = name.encode().ljust(len(name) + -len(name) % 8, b"\0") + content
+                name = "#1/%s" % (len(name) + -len(name) % 8)
+        elif len(name) > 15:
+            long_names += (name + "/\n").encode()
+            name = "/%s" % (len(long_names) - len(name) - 2)
+        else:
+            name += "/"
+        data += _header(name, len(content)) + content + b"\n" * (len(content) % 2)
+    if long_names:
+        data = _header("//", len(long_names)) + long_names + b"\n" * (len(long_names) % 2) + data
+    symbols = _header("__.SYMDEF" if bsd else "/", 4) + b"\0" * 4
+    return b"!<arch>\n" + symbols + data
+
+
+def macho_universal(*slices):
+    """ Universal (fat) Mach-O binary with the given thin binaries """
+    offset = 4096
+    archs, data = b"", b""
+    for binary in slices:
+        cputype = struct.unpack_from("<i", binary, 4)[0]
+        archs += struct.pack(">iiIII", cputype, 3, offset + len(data), len(binary), 12)
+        data += binary.ljust(4096, b"\0")
+    header = struct.pack(">II", 0xcafebabe, len(slices)) + archs
+    return header.ljust(offset, b"\0") + data